@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Time the DataPillager JSON codec backends on Esri feature JSON.
+
+Builds a synthetic polygon query response (or reads one saved from a real
+service with --file) and reports parse and serialize time per MB for every
+backend installed in this Python environment.
+
+    python benchmarks/json_codec_benchmark.py --size-mb 20 --repeat 5
+    python benchmarks/json_codec_benchmark.py --file chunk0.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datapillager_json  # noqa: E402
+
+
+def make_feature_collection(size_mb, vertices=60, seed=42):
+    """A polygon query response of roughly size_mb megabytes of JSON."""
+    rng = random.Random(seed)
+    fields = [
+        {"name": "OBJECTID", "type": "esriFieldTypeOID", "alias": "OBJECTID"},
+        {"name": "NAME", "type": "esriFieldTypeString", "alias": "Name", "length": 100},
+        {"name": "AREA_HA", "type": "esriFieldTypeDouble", "alias": "Area (ha)"},
+        {"name": "CREATED", "type": "esriFieldTypeDate", "alias": "Created", "length": 8},
+        {"name": "GlobalID", "type": "esriFieldTypeGlobalID", "alias": "GlobalID", "length": 38},
+    ]
+    response = {
+        "objectIdFieldName": "OBJECTID",
+        "globalIdFieldName": "GlobalID",
+        "geometryType": "esriGeometryPolygon",
+        "spatialReference": {"wkid": 102100, "latestWkid": 3857},
+        "fields": fields,
+        "features": [],
+    }
+
+    target = size_mb * 1024 * 1024
+    approx_size = 0
+    oid = 0
+    while approx_size < target:
+        oid += 1
+        x0 = rng.uniform(-20000000, 20000000)
+        y0 = rng.uniform(-10000000, 10000000)
+        ring = [[round(x0 + rng.uniform(-500, 500), 4), round(y0 + rng.uniform(-500, 500), 4)] for _ in range(vertices)]
+        ring.append(ring[0])
+        feature = {
+            "attributes": {
+                "OBJECTID": oid,
+                "NAME": f"Parcel {oid} Rāwhiti Road",
+                "AREA_HA": rng.uniform(0, 1000),
+                "CREATED": 1600000000000 + oid * 1000,
+                "GlobalID": "{%08X-0000-4000-8000-%012X}" % (oid, rng.getrandbits(48)),
+            },
+            "geometry": {"rings": [ring]},
+        }
+        response["features"].append(feature)
+        approx_size += vertices * 30 + 200
+    return response
+
+
+def time_call(func, arg, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=10, help="size of the synthetic response")
+    parser.add_argument("--file", help="time this saved query response instead of synthetic data")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as handle:
+            body = handle.read()
+    else:
+        datapillager_json.use_backend("json")
+        body = datapillager_json.dump_bytes(make_feature_collection(args.size_mb))
+    size_mb = len(body) / (1024 * 1024)
+    print(f"{size_mb:.1f} MB of feature JSON, best of {args.repeat} runs")
+    print(f"{'backend':<8} {'parse ms/MB':>12} {'dump ms/MB':>12} {'parse MB/s':>12}")
+
+    for name in datapillager_json.BACKENDS:
+        datapillager_json.use_backend(name)
+        parsed = datapillager_json.loads(body)
+        parse_seconds = time_call(datapillager_json.loads, body, args.repeat)
+        dump_seconds = time_call(datapillager_json.dump_bytes, parsed, args.repeat)
+        print(
+            f"{name:<8} {parse_seconds * 1000 / size_mb:>12.1f} {dump_seconds * 1000 / size_mb:>12.1f} "
+            f"{size_mb / parse_seconds:>12.1f}"
+        )
+
+    if "orjson" not in datapillager_json.BACKENDS:
+        print("orjson is not installed; pip install orjson to compare")
+
+
+if __name__ == "__main__":
+    main()
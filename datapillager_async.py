@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Optional asyncio HTTP transport for DataPillager.
+
+Threads over requests.Session cost a thread (and its stack) per in-flight
+request. AsyncHttpEngine runs an aiohttp session on one background event loop
+thread instead, so hundreds of requests can be in flight at once. Callers stay
+synchronous: request() blocks for a result and submit() returns a
+concurrent.futures.Future. Both hand back plain requests.Response objects, and
+failures raise the usual requests exceptions, so existing error handling keeps
+working unchanged.
+
+aiohttp is optional. When it is not installed AVAILABLE is False and the
+runner keeps using its requests session.
+"""
+
+import asyncio
+import ssl
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+AVAILABLE = aiohttp is not None
+
+# Same statuses create_session retries with urllib3.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _query_params(params):
+    # aiohttp only accepts str/int/float values; match requests by dropping None
+    # and rendering everything else the way requests would.
+    if not params:
+        return None
+    return {key: str(value) for key, value in params.items() if value is not None}
+
+
+class AsyncHttpEngine:
+    """Run HTTP requests on a private asyncio event loop thread.
+
+    max_concurrency caps requests on the wire; submit() blocks once twice that
+    many are queued, so producers can't run ahead of the network. Retries follow
+    create_session: up to max_tries attempts, RETRY_STATUSES and connection
+    errors retried with a sleep_time * 2 ** (attempt - 1) backoff. An optional
+    rate_limiter (the runner's HostRateLimiter) is consulted before every send
+    and told about throttle responses, which wait on it instead of the backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=100,
+        max_tries=5,
+        sleep_time=2,
+        connect_timeout=10,
+        read_timeout=60,
+        verify=True,
+        headers=None,
+        rate_limiter=None,
+    ):
+        if aiohttp is None:
+            raise RuntimeError("The async transport requires the aiohttp package")
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_tries = max(1, int(max_tries))
+        self.sleep_time = sleep_time
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.verify = verify
+        self.headers = dict(headers or {})
+        self.rate_limiter = rate_limiter
+
+        self._pending = threading.BoundedSemaphore(self.max_concurrency * 2)
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._slots = None
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="datapillager-async", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+        return self
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def _open(self):
+        if self.verify is False:
+            ssl_context = False
+        elif isinstance(self.verify, str):
+            ssl_context = ssl.create_default_context(cafile=self.verify)
+        else:
+            ssl_context = None
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=0, ssl=ssl_context)
+        timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    def submit(self, method, url, params=None, data=None, headers=None):
+        """Queue a request and return a concurrent.futures.Future resolving to a requests.Response."""
+        self._pending.acquire()
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._request(method, url, params, data, headers), self._loop
+            )
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def request(self, method, url, params=None, data=None, headers=None):
+        """Blocking request; returns a requests.Response or raises a requests exception."""
+        return self.submit(method, url, params=params, data=data, headers=headers).result()
+
+    async def _request(self, method, url, params, data, headers):
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                async with self._slots:
+                    response = await self._send(method, url, params, data, headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                if attempt >= self.max_tries:
+                    raise self._as_requests_error(ex, url) from ex
+            else:
+                retry_after = response.headers.get("Retry-After")
+                throttled = response.status_code == 429 or (response.status_code == 503 and retry_after)
+                if self.rate_limiter is not None:
+                    if throttled:
+                        self.rate_limiter.throttled(url, retry_after)
+                    elif response.status_code not in RETRY_STATUSES:
+                        self.rate_limiter.succeeded(url)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_tries:
+                    return response
+                if throttled and self.rate_limiter is not None:
+                    # The limiter already holds this host back for Retry-After.
+                    attempt += 1
+                    continue
+            await asyncio.sleep(self.sleep_time * 2 ** (attempt - 1))
+            attempt += 1
+
+    async def _send(self, method, url, params, data, headers):
+        async with self._session.request(
+            method, url, params=_query_params(params), data=_query_params(data), headers=headers
+        ) as raw:
+            body = await raw.read()
+            response = requests.Response()
+            response.status_code = raw.status
+            response.reason = raw.reason
+            response.headers = CaseInsensitiveDict(raw.headers)
+            response.url = str(raw.url)
+            response.encoding = raw.charset
+            response._content = body
+            return response
+
+    @staticmethod
+    def _as_requests_error(ex, url):
+        if isinstance(ex, asyncio.TimeoutError):
+            return requests.Timeout(f"Request to {url} timed out")
+        if isinstance(ex, aiohttp.ClientConnectionError):
+            return requests.ConnectionError(f"{url}: {ex}")
+        return requests.RequestException(f"{url}: {ex}")
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Process pool for the JSON-to-features conversion stage.
+
+JSONToFeatures is CPU bound and holds the runner's arcpy lock, so converting
+chunks on the main thread leaves the network idle while it runs.
+The runner hands each downloaded chunk file to convert_chunk in a worker
+process instead. Every process writes into its own scratch file geodatabase,
+because file geodatabases do not take concurrent writers from several
+processes.
+
+Inside ArcGIS Pro sys.executable is ArcGISPro.exe, so worker processes are
+started with the environment's pythonw.exe (no console window) instead.
+Spawned workers start with a default arcpy.env, so create_pool hands them the
+runner's overwriteOutput and preserveGlobalIds settings.
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+
+import arcpy
+
+
+def _worker_executable():
+    """pythonw.exe/python.exe of the running environment when hosted by ArcGISPro.exe, else None."""
+    if os.path.basename(sys.executable).lower() != "arcgispro.exe":
+        return None
+    for name in ("pythonw.exe", "python.exe"):
+        candidate = os.path.join(sys.exec_prefix, name)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _init_worker(overwrite_output, preserve_global_ids):
+    """Give a freshly spawned worker the same arcpy.env as the runner's process."""
+    arcpy.env.overwriteOutput = overwrite_output
+    if preserve_global_ids is not None and hasattr(arcpy.env, "preserveGlobalIds"):
+        arcpy.env.preserveGlobalIds = preserve_global_ids
+
+
+def create_pool(workers, overwrite_output=True, preserve_global_ids=None):
+    """A spawn-based ProcessPoolExecutor with workers processes that can import arcpy.
+
+    Each worker's arcpy.env gets overwrite_output and, unless it is None,
+    preserve_global_ids.
+    """
+    executable = _worker_executable()
+    if executable:
+        multiprocessing.set_executable(executable)
+    context = multiprocessing.get_context("spawn")
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(overwrite_output, preserve_global_ids),
+    )
+
+
+def scratch_prefix(service_name_cl):
+    return f"{service_name_cl}_scratch_"
+
+
+def convert_chunk(json_file, out_name, scratch_folder, prefix, folder_output=False):
+    """Convert one chunk's JSON file and return the output feature class path.
+
+    Runs in a worker process. Geodatabase runs write into
+    <scratch_folder>/<prefix><pid>.gdb, which is created on first use;
+    folder output writes <out_name>.shp into scratch_folder. The JSON file
+    is removed once converted. arcpy errors are re-raised as RuntimeError so
+    they pickle cleanly back to the parent.
+    """
+    try:
+        if folder_output:
+            out_fc = os.path.join(scratch_folder, f"{out_name}.shp")
+        else:
+            gdb_name = f"{prefix}{os.getpid()}.gdb"
+            gdb_path = os.path.join(scratch_folder, gdb_name)
+            if not arcpy.Exists(gdb_path):
+                arcpy.management.CreateFileGDB(scratch_folder, gdb_name)
+            out_fc = os.path.join(gdb_path, out_name)
+        arcpy.conversion.JSONToFeatures(json_file, out_fc)
+    except Exception as ex:
+        raise RuntimeError(f"Converting {json_file} failed: {ex}") from None
+    os.remove(json_file)
+    return out_fc
+
+
+def scratch_workspaces(scratch_folder, prefix):
+    """Paths of the scratch geodatabases left in scratch_folder for prefix."""
+    if not os.path.isdir(scratch_folder):
+        return []
+    return [
+        os.path.join(scratch_folder, name)
+        for name in sorted(os.listdir(scratch_folder))
+        if name.startswith(prefix) and name.lower().endswith(".gdb")
+    ]
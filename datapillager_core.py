@@ -6,12 +6,18 @@ an optional message callback.
 """
 
 import codecs
+import collections
+import concurrent.futures
 import datetime
+import hashlib
 import itertools
 import json
+import logging
 import os
 import re
 import shutil
+import threading
+import time
 import traceback
 import urllib.parse
 import warnings
@@ -19,9 +25,16 @@ import warnings
 import arcpy
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.exceptions import InsecureRequestWarning
+from urllib3.exceptions import InsecureRequestWarning, ReadTimeoutError
 from urllib3.util.retry import Retry
 
+import datapillager_async
+import datapillager_convert
+import datapillager_json
+from datapillager_pbf import PbfDecodeError, decode_feature_collection
+from datapillager_ratelimit import HostRateLimiter, RequestSlots
+from datapillager_stream import FEATURE, FeatureFileWriter, StreamParseError, iter_feature_collection
+
 
 class DataPillagerError(Exception):
     """Raised for expected operational failures in the pillaging workflow."""
@@ -29,6 +42,338 @@ class DataPillagerError(Exception):
 
 CORE_VERSION = "v2.4.1"
 
+# Statuses meaning the host won't take a queryAttachments POST at all, rather than a transient failure.
+POST_REFUSED_STATUSES = (405, 411, 413, 414)
+
+
+class AdaptiveChunkSizer:
+    """Per-layer batch size that shrinks on timeouts/transfer limits and grows on fast, small responses."""
+
+    fast_seconds = 5.0
+    slow_seconds = 30.0
+    small_bytes = 5 * 1024 * 1024
+
+    def __init__(self, initial, maximum, minimum=100):
+        self.maximum = max(1, int(maximum))
+        self.minimum = min(int(minimum), self.maximum)
+        self.size = min(max(int(initial), self.minimum), self.maximum)
+        self.records = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def shrink(self):
+        """Halve the batch size. Returns False if it was already at the minimum."""
+        with self._lock:
+            if self.size <= self.minimum:
+                return False
+            self.size = max(self.minimum, self.size // 2)
+            return True
+
+    def record(self, records, seconds, nbytes):
+        with self._lock:
+            self.records += records
+            self.seconds += seconds
+            self.bytes += nbytes
+            if seconds > self.slow_seconds:
+                self.size = max(self.minimum, int(self.size * 0.75))
+            elif seconds < self.fast_seconds and nbytes < self.small_bytes:
+                self.size = min(self.maximum, int(self.size * 1.5))
+
+    @property
+    def throughput(self):
+        """Features per second across every request recorded so far."""
+        return self.records / self.seconds if self.seconds else 0.0
+
+
+class PoolWarningHandler(logging.Handler):
+    """Surfaces urllib3 "connection pool is full" warnings through the runner's messages.
+
+    The first discard per host is reported immediately; the totals are
+    reported once the run finishes.
+    """
+
+    def __init__(self, emit):
+        super().__init__(level=logging.WARNING)
+        self._emit = emit
+        self._lock = threading.Lock()
+        self.discards = collections.Counter()
+
+    def emit(self, record):
+        if "pool is full" not in str(record.msg).lower():
+            return
+        host = str(record.args[0]) if record.args else "unknown host"
+        with self._lock:
+            self.discards[host] += 1
+            first = self.discards[host] == 1
+        if first:
+            self._emit(
+                f"Connection pool to {host} is full, connections be discarded and reopened. "
+                "Raise the pool max size or lower the concurrency settings.",
+                severity=1,
+            )
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that takes a rate limiter token per request and handles 429s itself.
+
+    429 is left out of the urllib3 retry list so every throttle response
+    reaches the limiter; it is retried here, up to max_tries, once the limiter
+    says the host may be tried again. Waits go through sleep, so the runner can
+    hand its request slot back while a host is held off.
+    """
+
+    def __init__(self, limiter, max_tries, sleep=time.sleep, **kwargs):
+        self.limiter = limiter
+        self.max_tries = max_tries
+        self.sleep = sleep
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        attempt = 1
+        while True:
+            self.limiter.acquire(request.url, sleep=self.sleep)
+            response = super().send(request, **kwargs)
+            retry_after = response.headers.get("Retry-After")
+            if response.status_code == 503 and retry_after:
+                # urllib3 has already retried this one; just slow the host down.
+                self.limiter.throttled(request.url, retry_after)
+                return response
+            if response.status_code != 429:
+                self.limiter.succeeded(request.url)
+                return response
+            self.limiter.throttled(request.url, retry_after)
+            if attempt >= self.max_tries:
+                return response
+            response.close()
+            attempt += 1
+
+
+class TransferStats:
+    """Bytes on the wire vs decoded bytes per query URL.
+
+    Responses larger than min_compressible that arrive without a
+    Content-Encoding are counted as uncompressed, which is how a server or
+    proxy stripping gzip shows up. Responses whose wire size is unknown
+    (wire_bytes None) are only counted as unmeasured.
+    """
+
+    min_compressible = 2048
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._urls = collections.defaultdict(collections.Counter)
+        self._stripping_hosts = set()
+
+    def record(self, url, wire_bytes, decoded_bytes, content_encoding):
+        """Count one response; returns True the first time a host sends a large uncompressed body."""
+        uncompressed = decoded_bytes >= self.min_compressible and not content_encoding
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        with self._lock:
+            counts = self._urls[url]
+            counts["responses"] += 1
+            if wire_bytes is None:
+                counts["unmeasured"] += 1
+                return False
+            counts["wire"] += wire_bytes
+            counts["decoded"] += decoded_bytes
+            if not uncompressed:
+                return False
+            counts["uncompressed"] += 1
+            if host in self._stripping_hosts:
+                return False
+            self._stripping_hosts.add(host)
+            return True
+
+    def pop(self, url):
+        with self._lock:
+            return self._urls.pop(url, None)
+
+
+class TokenManager:
+    """Thread-safe holder for the current token, refreshed ahead of its expiry.
+
+    generate returns (token, expires) with expires in epoch milliseconds, as
+    generateToken reports it. Without generate (an existing token was
+    supplied) the token is used as is and cannot be refreshed.
+    """
+
+    refresh_margin = 600
+
+    def __init__(self, token, expires=None, generate=None):
+        self._token = token
+        self._expires = expires
+        self._generate = generate
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def _expiring(self):
+        return self._expires is not None and time.time() > self._expires / 1000 - self.refresh_margin
+
+    def _regenerate(self):
+        self._token, self._expires = self._generate()
+        self.refreshes += 1
+
+    @property
+    def token(self):
+        with self._lock:
+            if self._generate is not None and self._expiring():
+                self._regenerate()
+            return self._token
+
+    def refresh(self, stale_token):
+        """Replace a token the server rejected. Returns False when there is no way to get a new one.
+
+        If another worker already replaced stale_token, its replacement is
+        kept rather than generating yet another token.
+        """
+        with self._lock:
+            if stale_token != self._token:
+                return True
+            if self._generate is None:
+                return False
+            self._regenerate()
+            return True
+
+
+class MetadataCache:
+    """On-disk cache of service and layer metadata responses, keyed by URL, params and identity.
+
+    Entries younger than ttl_minutes are served without a request; older
+    entries are revalidated with If-None-Match/If-Modified-Since when the
+    server supplied an ETag or Last-Modified header, and fetched again
+    otherwise. serviceItemId/editingInfo.lastEditDate are not used as
+    validators: they live in the same JSON, so checking them costs the same
+    request as a refetch. identity (a username or token) keeps secured
+    responses apart per user; only its hash is used.
+    """
+
+    def __init__(self, folder, ttl_minutes, identity=None):
+        self.folder = folder
+        self.ttl = datetime.timedelta(minutes=ttl_minutes).total_seconds()
+        self.identity = hashlib.sha256(identity.encode("utf-8")).hexdigest() if identity else ""
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, url, params):
+        # Tokens change every run and must never be written to disk.
+        key_params = sorted((k, str(v)) for k, v in (params or {}).items() if k != "token")
+        key = json.dumps([url.rstrip("/").lower(), key_params, self.identity])
+        return os.path.join(self.folder, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json")
+
+    def get(self, url, params):
+        try:
+            with open(self._path(url, params)) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched", 0) < self.ttl
+
+    @staticmethod
+    def revalidation_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("lastModified"):
+            headers["If-Modified-Since"] = entry["lastModified"]
+        return headers
+
+    def put(self, url, params, body, headers=None):
+        headers = headers or {}
+        entry = {
+            "url": url,
+            "fetched": time.time(),
+            "etag": headers.get("ETag"),
+            "lastModified": headers.get("Last-Modified"),
+            "body": body,
+        }
+        path = self._path(url, params)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as handle:
+            json.dump(entry, handle)
+        os.replace(temp_path, path)
+
+    def count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+
+class AttachmentStore:
+    """Local store of downloaded attachments for one layer.
+
+    Attachments are recorded by (parentObjectId, attachment id, size) so a
+    rerun only downloads new or changed files. File bodies are kept once per
+    content hash under blobs/ and hard-linked to where each run needs them.
+    """
+
+    def __init__(self, folder, layer_name):
+        self.blob_folder = os.path.join(folder, "blobs")
+        self.manifest_file = os.path.join(folder, f"{layer_name}.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_folder, exist_ok=True)
+        try:
+            with open(self.manifest_file) as handle:
+                self.entries = json.load(handle)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(parent_oid, att_id):
+        return f"{parent_oid}/{att_id}"
+
+    @staticmethod
+    def link(source, target):
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            # Hard links need the same volume and filesystem support.
+            shutil.copyfile(source, target)
+
+    def lookup(self, parent_oid, att_id, size):
+        """Return the stored file for this attachment if we already hold it at this size."""
+        with self._lock:
+            entry = self.entries.get(self._key(parent_oid, att_id))
+        if not entry or entry.get("size") != size:
+            return None
+        blob = os.path.join(self.blob_folder, entry["sha256"])
+        return blob if os.path.isfile(blob) else None
+
+    def add(self, parent_oid, att_id, size, file_path, digest):
+        """Record a fresh download, keeping a single copy per content hash."""
+        blob = os.path.join(self.blob_folder, digest)
+        with self._lock:
+            if os.path.isfile(blob):
+                self.link(blob, file_path)
+            else:
+                self.link(file_path, blob)
+            self.entries[self._key(parent_oid, att_id)] = {"size": size, "sha256": digest}
+
+    def add_bytes(self, parent_oid, att_id, size, data):
+        digest = hashlib.sha256(data).hexdigest()
+        blob = os.path.join(self.blob_folder, digest)
+        with self._lock:
+            if not os.path.isfile(blob):
+                # Written aside and renamed, so a failed write never leaves a partial blob under its hash.
+                temp_path = f"{blob}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as handle:
+                    handle.write(data)
+                os.replace(temp_path, blob)
+            self.entries[self._key(parent_oid, att_id)] = {"size": size, "sha256": digest}
+
+    def save(self):
+        with self._lock:
+            temp_path = f"{self.manifest_file}.tmp"
+            with open(temp_path, "w") as handle:
+                json.dump(self.entries, handle)
+            os.replace(temp_path, self.manifest_file)
+
 
 class DataPillagerRunner:
     @staticmethod
@@ -72,22 +417,79 @@ class DataPillagerRunner:
         self.write_service_info = self._to_bool(config.get("write_service_info"), default=True)
         self.include_attachments = self._to_bool(config.get("include_attachments"), default=False)
         self.clean_up_temp_attachments_data = self._to_bool(config.get("clean_up_temp_attachments_data"), default=False)
+        self.max_concurrent_attachments = max(1, int(config.get("max_concurrent_attachments") or 4))
+        self.attachment_retries = max(1, int(config.get("attachment_retries") or 3))
+        self.skip_existing_attachments = self._to_bool(config.get("skip_existing_attachments"), default=False)
+        self.direct_attachment_load = self._to_bool(config.get("direct_attachment_load"), default=False)
+        self.download_block_size = 1024 * 1024
+        self.max_concurrent_chunks = max(1, int(config.get("max_concurrent_chunks") or 1))
+        self.max_concurrent_layers = max(1, int(config.get("max_concurrent_layers") or 1))
+        self.max_inflight_requests = max(1, int(config.get("max_inflight_requests") or 16))
+        self.max_discovery_workers = max(1, int(config.get("max_discovery_workers") or 8))
+        self.pool_connections = max(1, int(config.get("pool_connections") or 10))
+        self.pool_maxsize = max(1, int(config.get("pool_maxsize") or max(10, self.max_inflight_requests)))
+        self.pool_block = self._to_bool(config.get("pool_block"), default=False)
+        self.connect_timeout = float(config.get("connect_timeout") or 10)
+        self.read_timeout = float(config.get("read_timeout") or 60)
+        self.request_timeout = (self.connect_timeout, self.read_timeout)
+        self.async_transport = self._to_bool(config.get("async_transport"), default=False)
+        self.requests_per_second = float(config.get("requests_per_second") or 0)
+        self.max_get_url_length = max(256, int(config.get("max_get_url_length") or 2000))
+        self.query_by_object_ids = self._to_bool(config.get("query_by_object_ids"), default=False)
+        self.streaming_parse = self._to_bool(config.get("streaming_parse"), default=False)
+        # Process-wide: the last runner created in this process picks the codec for all of them.
+        self.json_backend = datapillager_json.use_backend(config.get("json_backend"))
+        self.conversion_processes = max(0, int(config.get("conversion_processes") or 0))
+        self.metadata_cache_path = (config.get("metadata_cache_path") or "").strip()
+        metadata_cache_ttl = config.get("metadata_cache_ttl_minutes")
+        self.metadata_cache_ttl_minutes = 1440 if metadata_cache_ttl in (None, "") else max(0, int(metadata_cache_ttl))
+        self.stream_to_output = self._to_bool(config.get("stream_to_output"), default=False)
+        self.resume = self._to_bool(config.get("resume"), default=False)
+        self.incremental_sync = self._to_bool(config.get("incremental_sync"), default=False)
+        self.chunk_strategy = (config.get("chunk_strategy") or "auto").strip().lower()
+        self.max_oid_span_ratio = max(1.0, float(config.get("max_oid_span_ratio") or 4))
+        self.adaptive_chunk_size = self._to_bool(config.get("adaptive_chunk_size"), default=False)
+        self.use_pbf = self._to_bool(config.get("use_pbf"), default=False)
+        self.max_allowable_offset = float(config.get("max_allowable_offset") or 0)
+        self.geometry_precision = config.get("geometry_precision")
+        self.quantization_tolerance = float(config.get("quantization_tolerance") or 0)
 
         self.sanity_max_record_count = 10000
         self.service_output_name_tracking_list = []
         self.output_type = None
 
         self.session = None
+        self.metadata_cache = None
+        self._pool_warnings = None
+        self.async_engine = None
+        # One conversion process pool for the whole run, started by the first layer that needs it.
+        self.convert_pool = None
+        self._convert_pool_lock = threading.Lock()
+        # (folder, prefix) of finished layers' scratch geodatabases, removed once the pool is down.
+        self._scratch_to_clear = []
+        self.transfer_stats = TransferStats()
+        self.token_manager = None
+        # referer -> generateToken URL, so test_url probing happens once per run
+        self._token_endpoints = {}
+        self.rate_limiter = HostRateLimiter(self.requests_per_second, emit=self._emit)
+        # host -> whether queryAttachments accepts POST (None until known)
+        self._post_support = {}
+        # Shared by every worker thread: caps HTTP requests across layers and chunks,
+        # and serializes geoprocessing calls which are not safe to run concurrently.
+        self._request_slots = RequestSlots(self.max_inflight_requests)
+        self._arcpy_lock = threading.RLock()
+        self._emit_lock = threading.Lock()
         self.user_overwrite_setting = arcpy.env.overwriteOutput
         self.user_preserve_globalids_setting = getattr(arcpy.env, "preserveGlobalIds", None)
 
     def _emit(self, msg, severity=0):
         lines = str(msg).splitlines() or [str(msg)]
-        for line in lines:
-            if self.message_handler:
-                self.message_handler(line, severity)
-            else:
-                print(line)
+        with self._emit_lock:
+            for line in lines:
+                if self.message_handler:
+                    self.message_handler(line, severity)
+                else:
+                    print(line)
 
     @staticmethod
     def trace():
@@ -100,10 +502,19 @@ class DataPillagerRunner:
         retry_strategy = Retry(
             total=self.max_tries,
             backoff_factor=self.sleep_time,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=[500, 502, 503, 504],
             allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
+            respect_retry_after_header=True,
+        )
+        adapter = RateLimitedAdapter(
+            self.rate_limiter,
+            self.max_tries,
+            sleep=self._request_slots.sleep,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            max_retries=retry_strategy,
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         session.headers.update({"User-Agent": "Mozilla/5.0"})
@@ -120,7 +531,7 @@ class DataPillagerRunner:
 
     def test_url(self, url_to_test):
         try:
-            response = self.session.get(url_to_test, timeout=10)
+            response = self.session.get(url_to_test, timeout=self.request_timeout)
             if response.status_code == 200:
                 self._emit(f"Ho, a successful url test: {url_to_test}")
                 return url_to_test
@@ -145,6 +556,11 @@ class DataPillagerRunner:
         return urllib.parse.urlunsplit([parsed.scheme, parsed.netloc, "", "", ""])
 
     def get_token(self, referer, adapter_name, client_type="requestip", expiration=240):
+        token, _ = self._generate_token(referer, adapter_name, client_type, expiration)
+        return token
+
+    def _generate_token(self, referer, adapter_name, client_type="requestip", expiration=240):
+        """Ask generateToken for a token; returns (token, expires in epoch milliseconds or None)."""
         query_dict = {
             "username": self.username,
             "password": self.password,
@@ -154,43 +570,232 @@ class DataPillagerRunner:
             "f": "json",
         }
 
-        token_url = None
+        token_url = self._token_endpoints.get(referer)
         token_url_array = [
             f"{referer}/sharing/rest/generateToken",
             f"{referer}/{adapter_name}/tokens/generateToken",
         ]
 
-        for url_to_test in token_url_array:
-            if self.test_url(url_to_test):
-                token_url = url_to_test
-                break
+        if not token_url:
+            for url_to_test in token_url_array:
+                if self.test_url(url_to_test):
+                    token_url = url_to_test
+                    self._token_endpoints[referer] = token_url
+                    break
 
         if not token_url:
             raise DataPillagerError("Unable to locate token endpoint for the provided service")
 
-        response = self.session.post(token_url, data=query_dict)
+        response = self.session.post(token_url, data=query_dict, timeout=self.request_timeout)
         token_json = response.json()
 
         if "token" in token_json:
-            return token_json["token"]
+            return token_json["token"], token_json.get("expires")
 
         raise DataPillagerError("Could not generate a token with the username and password provided")
 
-    def execute_query(self, url, params=None):
+    def _get_json(self, url, params=None):
+        """Query url and return (parsed response, body size in bytes). Request errors propagate.
+
+        Requests whose URL would exceed max_get_url_length are sent as a form
+        POST instead of a GET. f=pbf bodies are decoded into the same shape as
+        the JSON response; servers still answer errors for those requests in JSON.
+        """
+        params = self._fresh_token_params(params)
+        resp_json, nbytes = self._send_query(url, params)
+        if self._token_rejected(resp_json, params) and self.token_manager.refresh(params["token"]):
+            self._emit("Token rejected, fetched a fresh one and tryin' again", severity=1)
+            resp_json, nbytes = self._send_query(url, self._fresh_token_params(params))
+        return resp_json, nbytes
+
+    def _send_query(self, url, params):
+        use_post = self._use_post(url, params)
+        if self.async_engine is not None:
+            if use_post:
+                response = self.async_engine.request("POST", url, data=params)
+            else:
+                response = self.async_engine.request("GET", url, params=params)
+        else:
+            with self._request_slots:
+                if use_post:
+                    response = self.session.post(url, data=params, timeout=self.request_timeout)
+                else:
+                    response = self.session.get(url, params=params, timeout=self.request_timeout)
+        return self._decode_response(response, url, params)
+
+    def _use_post(self, url, params):
+        """True when url plus its encoded query string would be longer than max_get_url_length."""
+        if not params:
+            return False
+        return len(url) + 1 + len(urllib.parse.urlencode(params)) > self.max_get_url_length
+
+    def _record_transfer(self, url, response, decoded_bytes):
+        """Add a response to the transfer stats, warning the first time its host sends a large uncompressed body."""
+        content_encoding = response.headers.get("Content-Encoding", "")
+        if self.transfer_stats.record(url, self._wire_bytes(response), decoded_bytes, content_encoding):
+            self._emit(
+                f"{urllib.parse.urlsplit(url).netloc} be sendin' uncompressed responses even though we ask for gzip; "
+                "a server or proxy may be strippin' compression",
+                severity=1,
+            )
+
+    @staticmethod
+    def _wire_bytes(response):
+        """Bytes read off the socket for response, before any decoding, or None when that can't be known.
+
+        Async responses have no raw stream. urllib3 doesn't count chunked
+        bodies, so tell() stays at 0 for them, and they carry no
+        Content-Length either; the decoded size says nothing about the wire.
+        """
+        raw = getattr(response, "raw", None)
+        if raw is not None and hasattr(raw, "tell"):
+            try:
+                wire_bytes = raw.tell()
+            except (OSError, ValueError):
+                wire_bytes = 0
+            if wire_bytes:
+                return wire_bytes
+        length = response.headers.get("Content-Length", "")
+        return int(length) if length.isdigit() else None
+
+    def _fresh_token_params(self, params):
+        """params with its token swapped for the token manager's current one, if it carries a token."""
+        if self.token_manager is None or not params or not params.get("token"):
+            return params
+        token = self.token_manager.token
+        if params["token"] == token:
+            return params
+        return dict(params, token=token)
+
+    def _fresh_token_url(self, url):
+        """url with its token query argument swapped for the current token."""
+        if self.token_manager is None or "token=" not in url:
+            return url
+        parts = urllib.parse.urlsplit(url)
+        query = [
+            (key, self.token_manager.token if key == "token" else value)
+            for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        ]
+        return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+    def _token_rejected(self, resp_json, params):
+        """True for an invalid/expired (498) or missing (499) token error that a new token may fix."""
+        if self.token_manager is None or not params or not params.get("token") or not isinstance(resp_json, dict):
+            return False
+        error = resp_json.get("error")
+        return isinstance(error, dict) and error.get("code") in (498, 499)
+
+    @staticmethod
+    def _response_json(response):
+        """Parse a response body with the JSON codec; bad JSON surfaces as a RequestException like response.json()."""
         try:
-            response = self.session.get(url, params=params, timeout=60)
-            response.raise_for_status()
-            resp_json = response.json()
+            return datapillager_json.loads(response.content)
+        except ValueError as ex:
+            raise requests.RequestException(f"Invalid JSON from {response.url}: {ex}") from ex
+
+    def _decode_response(self, response, url, params):
+        if response.status_code in (498, 499):
+            # Some servers send token errors as the HTTP status rather than a 200 error body.
+            return {"error": {"code": response.status_code, "message": "Invalid token"}}, len(response.content)
+        response.raise_for_status()
+        self._record_transfer(url, response, len(response.content))
+        if params and params.get("f") == "pbf" and "json" not in response.headers.get("Content-Type", ""):
+            try:
+                return decode_feature_collection(response.content), len(response.content)
+            except PbfDecodeError as ex:
+                self._emit(f"Couldn't decode the PBF response ({ex}), askin' for JSON instead", severity=1)
+                return self._send_query(url, dict(params, f="json"))
+        resp_json = self._response_json(response)
+        if isinstance(resp_json, dict) and resp_json.get("transform") and resp_json.get("features"):
+            self._dequantize_features(resp_json)
+        return resp_json, len(response.content)
+
+    @staticmethod
+    def _dequantize_features(response):
+        """Turn quantized, per-path delta encoded JSON geometries back into real coordinates in place."""
+        transform = response.pop("transform")
+        scale = transform.get("scale") or [1, 1]
+        translate = transform.get("translate") or [0, 0]
+        y_sign = 1 if transform.get("originPosition") == "lowerLeft" else -1
+
+        def _dequantize_path(path):
+            x = y = 0
+            points = []
+            for coords in path:
+                x += coords[0]
+                y += coords[1]
+                points.append([x * scale[0] + translate[0], translate[1] + y_sign * y * scale[1]] + list(coords[2:]))
+            return points
+
+        for feature in response["features"]:
+            geometry = feature.get("geometry")
+            if not geometry:
+                continue
+            if "x" in geometry and geometry["x"] is not None:
+                geometry["x"] = geometry["x"] * scale[0] + translate[0]
+                geometry["y"] = translate[1] + y_sign * geometry["y"] * scale[1]
+            elif "points" in geometry:
+                geometry["points"] = _dequantize_path(geometry["points"])
+            for key in ("paths", "rings"):
+                if key in geometry:
+                    geometry[key] = [_dequantize_path(part) for part in geometry[key]]
+
+    def execute_query(self, url, params=None, use_cache=False):
+        if use_cache and self.metadata_cache is not None:
+            return self._cached_query(url, params)
+        try:
+            resp_json, _ = self._get_json(url, params=params)
             return resp_json
         except requests.RequestException as ex:
             return {"error": str(ex)}
 
+    def _cached_query(self, url, params, retry_token=True):
+        cache = self.metadata_cache
+        entry = cache.get(url, params)
+        if entry is not None and cache.is_fresh(entry):
+            cache.count("hits")
+            return entry["body"]
+
+        params = self._fresh_token_params(params)
+        try:
+            headers = cache.revalidation_headers(entry) if entry is not None else None
+            with self._request_slots:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.request_timeout)
+            if response.status_code == 304 and entry is not None:
+                cache.count("revalidated")
+                cache.put(url, params, entry["body"], response.headers)
+                return entry["body"]
+            response.raise_for_status()
+            resp_json = self._response_json(response)
+        except requests.RequestException as ex:
+            if entry is not None:
+                self._emit(f"Couldn't refresh {url} ({ex}), usin' cached metadata", severity=1)
+                return entry["body"]
+            return {"error": str(ex)}
+
+        if retry_token and self._token_rejected(resp_json, params) and self.token_manager.refresh(params["token"]):
+            return self._cached_query(url, params, retry_token=False)
+
+        cache.count("misses")
+        if isinstance(resp_json, dict) and not resp_json.get("error"):
+            cache.put(url, params, resp_json, response.headers)
+        return resp_json
+
     def get_all_the_layers(self, service_endpoint, token):
+        """Discover every downloadable layer below service_endpoint.
+
+        Folders, services and group layers are expanded breadth-first on up to
+        max_discovery_workers threads. Each service's layers come from a single
+        /layers request rather than one request per leaf, and URLs already seen
+        are not fetched again. Leaves are returned in depth-first order
+        (folders before services, layers in service order) so output naming
+        stays stable between runs.
+        """
         params = {"f": "json"}
         if token:
             params["token"] = token
 
-        service_layer_info = self.execute_query(service_endpoint, params=params)
+        service_layer_info = self.execute_query(service_endpoint, params=params, use_cache=True)
         service_error = service_layer_info.get("error")
         if service_error:
             if isinstance(service_error, dict) and service_error.get("code") in (498, 499):
@@ -207,56 +812,102 @@ class DataPillagerRunner:
                 f"Unable to access service endpoint: {error_message}"
             )
 
-        service_layers_to_walk = []
-        service_layers_to_get = []
+        if service_layer_info.get("layers") is not None:
+            service_layer_info = self._fetch_service_layers(service_endpoint, params, service_layer_info)
+
+        visited = {service_endpoint.rstrip("/").lower()}
+        leaves = []
+        pending = {}
+
+        def _expand(url, node_info, key, executor):
+            for child_url, child_fetch, child_key in self._discovery_children(url, node_info, key, leaves, params):
+                normalized = child_url.rstrip("/").lower()
+                if normalized in visited:
+                    continue
+                visited.add(normalized)
+                pending[executor.submit(child_fetch, child_url)] = (child_url, child_key)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_discovery_workers) as executor:
+            _expand(service_endpoint, service_layer_info, (), executor)
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    url, key = pending.pop(future)
+                    node_info = future.result()
+                    if node_info.get("error"):
+                        self._emit(f"Couldn't reach {url}: {node_info.get('error')}", severity=1)
+                        continue
+                    _expand(url, node_info, key, executor)
+
+        return [url for _, url in sorted(leaves)]
+
+    def _fetch_service_layers(self, service_url, params, service_info=None):
+        """Fetch every layer description of a service in one /layers request.
+
+        Older servers lack /layers; the plain service description is used
+        instead and its layers are then fetched one by one.
+        """
+        layers_info = self.execute_query(f"{service_url}/layers", params=params, use_cache=True)
+        if layers_info.get("error") or layers_info.get("layers") is None:
+            if service_info is not None:
+                return service_info
+            return self.execute_query(service_url, params=params, use_cache=True)
+        layers_info = dict(layers_info, _layerDetails=True)
+        return layers_info
+
+    def _discovery_children(self, url, node_info, key, leaves, params):
+        """Classify one discovery node, recording leaves and returning (url, fetch, key) for nodes to expand."""
+
+        def fetch_node(child_url):
+            return self.execute_query(child_url, params=params, use_cache=True)
+
+        def fetch_service_layers(child_url):
+            return self._fetch_service_layers(child_url, params)
 
-        if service_layer_info.get("folders"):
-            folder_list = [f for f in service_layer_info["folders"] if f.lower() != "utilities"]
-            for folder_name in folder_list:
+        children = []
+        if "folders" in node_info or "services" in node_info:
+            folder_list = [f for f in node_info.get("folders") or [] if f.lower() != "utilities"]
+            for idx, folder_name in enumerate(folder_list):
                 self._emit(f"Ahoy, I be searching {folder_name} for hidden treasure...")
-                lyr_list = self.get_all_the_layers(f"{service_endpoint}/{folder_name}", token)
-                if lyr_list:
-                    service_layers_to_walk.extend(lyr_list)
+                children.append((f"{url}/{folder_name}", fetch_node, key + (0, idx)))
 
-        if service_layer_info.get("services"):
-            for service in service_layer_info["services"]:
+            for idx, service in enumerate(node_info.get("services") or []):
                 service_type = service["type"]
                 service_name = service["name"]
                 if service_type in ["MapServer", "FeatureServer"]:
-                    service_url = f"{service_endpoint}/{service_name}/{service_type}"
+                    service_url = f"{url}/{service_name}/{service_type}"
                     if "/" in service_name:
                         folder, sname = service_name.split("/")
-                        if service_endpoint.endswith(folder):
-                            service_url = f"{service_endpoint}/{sname}/{service_type}"
-                    service_layers_to_walk.append(service_url)
-
-        if not service_layers_to_walk:
-            service_layers_to_walk.append(service_endpoint)
-
-        for url in service_layers_to_walk:
-            service_call = self.execute_query(url, params=params)
-            service_layers = service_call.get("layers") or service_call.get("subLayers")
-            service_layer_type = "layers" if service_call.get("layers") else "sublayers"
-
-            if service_layers is not None:
-                for lyr in service_layers:
-                    if not lyr.get("subLayerIds"):
-                        lyr_id = str(lyr.get("id"))
-                        if service_layer_type == "layers":
-                            sub_layer_url = f"{url}/{lyr_id}"
-                        else:
-                            sub_endpoint = url.rsplit("/", 1)[0]
-                            sub_layer_url = f"{sub_endpoint}/{lyr_id}"
-
-                        lyr_list = self.get_all_the_layers(sub_layer_url, token)
-                        if lyr_list:
-                            service_layers_to_walk.extend(lyr_list)
-                        else:
-                            service_layers_to_get.append(sub_layer_url)
-            elif service_call.get("type") not in ("Group Layer", "Raster Layer"):
-                service_layers_to_get.append(url)
+                        if url.endswith(folder):
+                            service_url = f"{url}/{sname}/{service_type}"
+                    children.append((service_url, fetch_service_layers, key + (1, idx)))
+            return children
+
+        service_layers = node_info.get("layers")
+        sub_layers = node_info.get("subLayers")
+        if service_layers is not None:
+            # Either a /layers listing with full layer details, or a bare service description.
+            for idx, lyr in enumerate(service_layers):
+                if lyr.get("subLayerIds"):
+                    continue
+                lyr_url = f"{url}/{lyr.get('id')}"
+                if node_info.get("_layerDetails"):
+                    if lyr.get("type") not in ("Group Layer", "Raster Layer"):
+                        leaves.append((key + (idx,), lyr_url))
+                        if self.metadata_cache is not None:
+                            # Seed the layer entry so pillage_the_layer doesn't fetch it again.
+                            self.metadata_cache.put(lyr_url, params, lyr)
+                else:
+                    children.append((lyr_url, fetch_node, key + (idx,)))
+        elif sub_layers:
+            sub_endpoint = url.rsplit("/", 1)[0]
+            for idx, lyr in enumerate(sub_layers):
+                if not lyr.get("subLayerIds"):
+                    children.append((f"{sub_endpoint}/{lyr.get('id')}", fetch_node, key + (idx,)))
+        elif node_info.get("type") not in ("Group Layer", "Raster Layer"):
+            leaves.append((key, url))
 
-        return service_layers_to_get
+        return children
 
     def combine_data(self, fc_list, output_fc):
         try:
@@ -322,104 +973,158 @@ class DataPillagerRunner:
         for idx in range(0, len(values), chunk_size):
             yield values[idx : idx + chunk_size]
 
+    def iter_chunk_responses(self, query_url, chunks, fetch=None):
+        """Yield (chunk, response) pairs in chunk order.
+
+        Up to max_concurrent_chunks requests are kept in flight; results are
+        handed back strictly in the order the chunks were supplied so callers
+        can write and count them exactly as they would serially. fetch
+        replaces the plain execute_query call for each chunk.
+        """
+        plain_fetch = fetch is None
+        if fetch is None:
+            def fetch(chunk):
+                return self.execute_query(query_url, params=chunk["params"])
+
+        if self.max_concurrent_chunks <= 1:
+            for chunk in chunks:
+                yield chunk, fetch(chunk)
+            return
+
+        if self.async_engine is not None and plain_fetch:
+            yield from self._iter_async_chunk_responses(query_url, chunks)
+            return
+
+        chunk_iter = iter(chunks)
+        pending = collections.deque()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_chunks)
+        try:
+            for chunk in itertools.islice(chunk_iter, self.max_concurrent_chunks):
+                pending.append((chunk, executor.submit(fetch, chunk)))
+
+            while pending:
+                chunk, future = pending.popleft()
+                response = future.result()
+                next_chunk = next(chunk_iter, None)
+                if next_chunk is not None:
+                    pending.append((next_chunk, executor.submit(fetch, next_chunk)))
+                yield chunk, response
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _iter_async_chunk_responses(self, query_url, chunks):
+        """iter_chunk_responses on the async transport: the same ordered window, but no worker threads."""
+        chunk_iter = iter(chunks)
+        pending = collections.deque()
+
+        def _submit(chunk):
+            params = self._fresh_token_params(chunk["params"])
+            if self._use_post(query_url, params):
+                future = self.async_engine.submit("POST", query_url, data=params)
+            else:
+                future = self.async_engine.submit("GET", query_url, params=params)
+            pending.append((chunk, future))
+
+        try:
+            for chunk in itertools.islice(chunk_iter, self.max_concurrent_chunks):
+                _submit(chunk)
+
+            while pending:
+                chunk, future = pending.popleft()
+                try:
+                    response, _ = self._decode_response(future.result(), query_url, chunk["params"])
+                    if self._token_rejected(response, chunk["params"]):
+                        # _get_json refreshes the token and retries
+                        response, _ = self._get_json(query_url, chunk["params"])
+                except requests.RequestException as ex:
+                    response = {"error": str(ex)}
+                next_chunk = next(chunk_iter, None)
+                if next_chunk is not None:
+                    _submit(next_chunk)
+                yield chunk, response
+        finally:
+            for _, future in pending:
+                future.cancel()
+
     def get_attachments(self, layer_url, final_fc, oid_list, service_name, output_folder, output_workspace, token):
         def _safe_filename(name):
             return re.sub(r"[<>:\"/\\|?*]", "_", name)
 
         try:
             att_folders = []
-            query_url = f"{layer_url}/queryAttachments"
-            attachment_groups = []
-            batch_size = 250
-            batch_count = (len(oid_list) + batch_size - 1) // batch_size
-            self._emit(
-                f"Attachment query batching enabled: {len(oid_list)} OIDs across {batch_count} batches of up to {batch_size}"
-            )
+            attachment_groups = self.query_attachment_groups(layer_url, oid_list, token)
 
-            # Avoid 414 URI Too Long by POSTing objectIds in manageable batches.
-            for batch_index, oid_batch in enumerate(self.chunk_list(oid_list, batch_size), start=1):
-                query_params = {
-                    "objectIds": ",".join(str(oid) for oid in oid_batch),
-                    "f": "json",
-                }
-                if token:
-                    query_params["token"] = token
+            if not attachment_groups:
+                self._emit("No attachments found for this layer")
+                return
 
-                try:
-                    self._emit(f"queryAttachments batch {batch_index}/{batch_count}: POST ({len(oid_batch)} OIDs)")
-                    response = self.session.post(query_url, data=query_params, timeout=120)
-                    response.raise_for_status()
-                except requests.RequestException:
-                    self._emit(f"queryAttachments batch {batch_index}/{batch_count}: POST failed, trying GET fallback", severity=1)
-                    response = self.session.get(query_url, params=query_params, timeout=120)
-                    response.raise_for_status()
-                att_data = response.json()
-                if att_data.get("error"):
-                    raise DataPillagerError(f"queryAttachments failed: {att_data.get('error')}")
+            with self._arcpy_lock:
+                if not arcpy.Describe(final_fc).path.lower().endswith(".gdb"):
+                    raise DataPillagerError("Attachments require file geodatabase output")
 
-                attachment_groups.extend(att_data.get("attachmentGroups", []))
+            store = None
+            if self.skip_existing_attachments:
+                store = AttachmentStore(os.path.join(output_folder, "_attachment_store"), service_name)
 
-            if not attachment_groups:
-                self._emit("No attachments found for this layer")
+            if self.direct_attachment_load:
+                self.load_attachments_direct(layer_url, final_fc, attachment_groups, token, store)
                 return
 
-            if not arcpy.Describe(final_fc).path.lower().endswith(".gdb"):
-                raise DataPillagerError("Attachments require file geodatabase output")
+            downloads = []
+            for att_group in attachment_groups:
+                parent_oid = att_group.get("parentObjectId")
+                infos = att_group.get("attachmentInfos", [])
+                if not infos:
+                    continue
 
-            try:
-                arcpy.management.EnableAttachments(final_fc)
-            except Exception:
-                # already enabled or unsupported edge case; AddAttachments will fail if truly invalid
-                pass
+                rel_folder = os.path.join(output_folder, f"{service_name}_attachments", str(parent_oid))
+                if not os.path.exists(rel_folder):
+                    os.makedirs(rel_folder)
+                    att_folders.append(rel_folder)
 
-            table_name = arcpy.ValidateTableName(f"{service_name}_attachment_match", output_workspace)
-            temp_match_table = os.path.join(output_workspace, table_name)
-            if arcpy.Exists(temp_match_table):
-                arcpy.management.Delete(temp_match_table)
+                for info in infos:
+                    att_id = info.get("id")
+                    att_name = _safe_filename(info.get("name") or f"attachment_{att_id}")
+                    att_url = f"{layer_url}/{parent_oid}/attachments/{att_id}"
 
-            arcpy.management.CreateTable(output_workspace, table_name)
-            arcpy.management.AddField(temp_match_table, "REL_OBJECTID", "LONG")
-            arcpy.management.AddField(temp_match_table, "ATT_PATH", "TEXT", field_length=500)
+                    # Token is carried in query string for binary attachment download.
+                    dl_url = att_url
+                    if token:
+                        dl_url = f"{att_url}?token={urllib.parse.quote(token)}"
 
-            with arcpy.da.InsertCursor(temp_match_table, ["REL_OBJECTID", "ATT_PATH"]) as cursor:
-                for att_group in attachment_groups:
-                    parent_oid = att_group.get("parentObjectId")
-                    infos = att_group.get("attachmentInfos", [])
-                    if not infos:
-                        continue
+                    downloads.append((parent_oid, dl_url, os.path.join(rel_folder, att_name), att_id, info.get("size")))
 
-                    rel_folder = os.path.join(output_folder, f"{service_name}_attachments", str(parent_oid))
-                    if not os.path.exists(rel_folder):
-                        os.makedirs(rel_folder)
-                        att_folders.append(rel_folder)
-
-                    for info in infos:
-                        att_id = info.get("id")
-                        att_name = _safe_filename(info.get("name") or f"attachment_{att_id}")
-                        att_url = f"{layer_url}/{parent_oid}/attachments/{att_id}"
-                        params = {"f": "json"}
-                        if token:
-                            params["token"] = token
-
-                        # Token is carried in query string for binary attachment download.
-                        dl_url = att_url
-                        if token:
-                            dl_url = f"{att_url}?token={urllib.parse.quote(token)}"
-
-                        out_file = os.path.join(rel_folder, att_name)
-                        response = self.session.get(dl_url, timeout=120)
-                        response.raise_for_status()
-                        with open(out_file, "wb") as handle:
-                            handle.write(response.content)
+            # Downloads run outside the geoprocessing lock so other layers can keep converting.
+            self._emit(f"Haulin' {len(downloads)} attachments, {self.max_concurrent_attachments} at a time")
+            self.download_attachments(downloads, store)
+
+            with self._arcpy_lock:
+                try:
+                    arcpy.management.EnableAttachments(final_fc)
+                except Exception:
+                    # already enabled or unsupported edge case; AddAttachments will fail if truly invalid
+                    pass
+
+                table_name = arcpy.ValidateTableName(f"{service_name}_attachment_match", output_workspace)
+                temp_match_table = os.path.join(output_workspace, table_name)
+                if arcpy.Exists(temp_match_table):
+                    arcpy.management.Delete(temp_match_table)
+
+                arcpy.management.CreateTable(output_workspace, table_name)
+                arcpy.management.AddField(temp_match_table, "REL_OBJECTID", "LONG")
+                arcpy.management.AddField(temp_match_table, "ATT_PATH", "TEXT", field_length=500)
+
+                with arcpy.da.InsertCursor(temp_match_table, ["REL_OBJECTID", "ATT_PATH"]) as cursor:
+                    for parent_oid, _, out_file, _, _ in downloads:
                         cursor.insertRow((parent_oid, out_file))
 
-            arcpy.management.AddAttachments(
-                final_fc,
-                "OBJECTID",
-                temp_match_table,
-                "REL_OBJECTID",
-                "ATT_PATH",
-            )
+                arcpy.management.AddAttachments(
+                    final_fc,
+                    "OBJECTID",
+                    temp_match_table,
+                    "REL_OBJECTID",
+                    "ATT_PATH",
+                )
             self._emit(f"Attachments added to {final_fc}")
 
             if self.clean_up_temp_attachments_data:
@@ -429,12 +1134,281 @@ class DataPillagerRunner:
                     except Exception as ex:
                         self._emit(f"Warning: Could not delete temporary attachment folder: {ex}", severity=1)
                 try:
-                    arcpy.management.Delete(temp_match_table)
+                    with self._arcpy_lock:
+                        arcpy.management.Delete(temp_match_table)
                 except Exception as ex:
                     self._emit(f"Warning: Could not delete temporary match table: {ex}", severity=1)
         except Exception as ex:
             self._emit(f"Warning: Could not download/add attachments: {ex}", severity=1)
 
+    def _query_attachment_batch(self, query_url, oid_batch, token):
+        """Run one queryAttachments batch, returning (attachment groups, response size).
+
+        POST avoids 414 URI Too Long. Only a status saying the host won't take
+        the POST (405/411/413/414) switches that host to GET for later batches;
+        timeouts and connection errors are retried on POST.
+        """
+        query_params = {
+            "objectIds": ",".join(str(oid) for oid in oid_batch),
+            "f": "json",
+        }
+        if token:
+            query_params["token"] = token
+        host = urllib.parse.urlparse(query_url).netloc
+
+        def _send(params):
+            if self._post_support.get(host) is not False:
+                for attempt in range(1, self.attachment_retries + 1):
+                    try:
+                        with self._request_slots:
+                            response = self.session.post(query_url, data=params, timeout=self.request_timeout)
+                        break
+                    except requests.RequestException:
+                        if attempt == self.attachment_retries:
+                            raise
+                        time.sleep(self.sleep_time * attempt)
+                if response.status_code not in POST_REFUSED_STATUSES:
+                    response.raise_for_status()
+                    self._post_support[host] = True
+                    return response
+                if self._post_support.get(host) is None:
+                    self._emit(
+                        f"queryAttachments POST refused by {host} ({response.status_code}), usin' GET from here on",
+                        severity=1,
+                    )
+                self._post_support[host] = False
+            with self._request_slots:
+                response = self.session.get(query_url, params=params, timeout=self.request_timeout)
+            response.raise_for_status()
+            return response
+
+        query_params = self._fresh_token_params(query_params)
+        response = _send(query_params)
+        att_data = self._response_json(response)
+        if self._token_rejected(att_data, query_params) and self.token_manager.refresh(query_params["token"]):
+            response = _send(self._fresh_token_params(query_params))
+            att_data = self._response_json(response)
+        if att_data.get("error"):
+            raise DataPillagerError(f"queryAttachments failed: {att_data.get('error')}")
+        return att_data.get("attachmentGroups", []), len(response.content)
+
+    def query_attachment_groups(self, layer_url, oid_list, token):
+        """Fetch attachmentGroups for oid_list with concurrent queryAttachments batches.
+
+        Batches go out in waves of max_concurrent_attachments. Between waves
+        the batch size adapts to observed response time and size, capped at
+        250 OIDs when the host only accepts GET (URL length).
+        """
+        query_url = f"{layer_url}/queryAttachments"
+        host = urllib.parse.urlparse(query_url).netloc
+        sizer = AdaptiveChunkSizer(initial=250, maximum=2000, minimum=25)
+        attachment_groups = []
+        position = 0
+        wave_count = 0
+        self._emit(f"Attachment query batching enabled: {len(oid_list)} OIDs, startin' at batches of {sizer.size}")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_attachments) as executor:
+            while position < len(oid_list):
+                batch_size = sizer.size if self._post_support.get(host) is not False else min(sizer.size, 250)
+                wave = []
+                for _ in range(self.max_concurrent_attachments):
+                    if position >= len(oid_list):
+                        break
+                    wave.append(oid_list[position : position + batch_size])
+                    position += batch_size
+
+                started = time.monotonic()
+                futures = [executor.submit(self._query_attachment_batch, query_url, batch, token) for batch in wave]
+                wave_bytes = 0
+                for future in futures:
+                    groups, nbytes = future.result()
+                    wave_bytes += nbytes
+                    attachment_groups.extend(groups)
+                # One sample per wave, so a wave of fast batches grows the size once rather than once per batch.
+                sizer.record(sum(len(batch) for batch in wave), time.monotonic() - started, wave_bytes)
+
+                wave_count += 1
+                self._emit(f"queryAttachments wave {wave_count}: {position}/{len(oid_list)} OIDs checked")
+
+        return attachment_groups
+
+    def download_file(self, url, out_file):
+        """Stream url to out_file in fixed-size blocks, retrying up to attachment_retries times.
+
+        The body goes to a temporary file that then replaces out_file, so an
+        out_file hard-linked to an attachment store blob is never written
+        through. Returns the SHA-256 hex digest of the body.
+        """
+        temp_file = f"{out_file}.{threading.get_ident()}.part"
+        for attempt in range(1, self.attachment_retries + 1):
+            token_refreshed = False
+            try:
+                digest = hashlib.sha256()
+                request_url = self._fresh_token_url(url)
+                with self._request_slots:
+                    with self.session.get(request_url, stream=True, timeout=self.request_timeout) as response:
+                        token_refreshed = self._url_token_rejected(response, request_url)
+                        response.raise_for_status()
+                        with open(temp_file, "wb") as handle:
+                            for block in response.iter_content(chunk_size=self.download_block_size):
+                                handle.write(block)
+                                digest.update(block)
+                os.replace(temp_file, out_file)
+                return digest.hexdigest()
+            except (requests.RequestException, OSError):
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                if attempt == self.attachment_retries:
+                    raise
+                if not token_refreshed:
+                    time.sleep(self.sleep_time * attempt)
+
+    def download_bytes(self, url):
+        """Stream url into a bytearray in fixed-size blocks, retrying up to attachment_retries times.
+
+        The bytearray is returned as is; copying it to bytes would briefly hold every body twice.
+        """
+        for attempt in range(1, self.attachment_retries + 1):
+            token_refreshed = False
+            try:
+                data = bytearray()
+                request_url = self._fresh_token_url(url)
+                with self._request_slots:
+                    with self.session.get(request_url, stream=True, timeout=self.request_timeout) as response:
+                        token_refreshed = self._url_token_rejected(response, request_url)
+                        response.raise_for_status()
+                        for block in response.iter_content(chunk_size=self.download_block_size):
+                            data.extend(block)
+                return data
+            except requests.RequestException:
+                if attempt == self.attachment_retries:
+                    raise
+                if not token_refreshed:
+                    time.sleep(self.sleep_time * attempt)
+
+    def _url_token_rejected(self, response, request_url):
+        """True when response rejects request_url's token (HTTP 498/499) and a fresh token is now available.
+
+        The caller retries straight away; _fresh_token_url picks up the new token.
+        """
+        if response.status_code not in (498, 499) or self.token_manager is None:
+            return False
+        token = urllib.parse.parse_qs(urllib.parse.urlsplit(request_url).query).get("token")
+        return bool(token) and self.token_manager.refresh(token[0])
+
+    def load_attachments_direct(self, layer_url, final_fc, attachment_groups, token, store=None):
+        """Insert attachment blobs straight into the __ATTACH table as they arrive.
+
+        Skips the temporary folders, the match table and the second read of
+        every file that AddAttachments does. At most twice
+        max_concurrent_attachments bodies are held in memory at once.
+        """
+        jobs = []
+        for att_group in attachment_groups:
+            parent_oid = att_group.get("parentObjectId")
+            for info in att_group.get("attachmentInfos", []):
+                att_id = info.get("id")
+                dl_url = f"{layer_url}/{parent_oid}/attachments/{att_id}"
+                if token:
+                    dl_url = f"{dl_url}?token={urllib.parse.quote(token)}"
+                jobs.append((parent_oid, dl_url, info))
+
+        def _read(job):
+            parent_oid, url, info = job
+            if store is not None:
+                held = store.lookup(parent_oid, info.get("id"), info.get("size"))
+                if held:
+                    with open(held, "rb") as handle:
+                        return job, handle.read()
+            data = self.download_bytes(url)
+            if store is not None:
+                store.add_bytes(parent_oid, info.get("id"), info.get("size"), data)
+            return job, data
+
+        with self._arcpy_lock:
+            arcpy.management.EnableAttachments(final_fc)
+            attach_table = f"{final_fc}__ATTACH"
+            attach_fields = {f.name.upper() for f in arcpy.ListFields(attach_table)}
+            parent_keys = None
+            rel_field = "REL_OBJECTID"
+            if "REL_GLOBALID" in attach_fields:
+                # Attachments relate by GlobalID; look up each parent's local GlobalID by OBJECTID.
+                rel_field = "REL_GLOBALID"
+                with arcpy.da.SearchCursor(final_fc, ["OID@", "GLOBALID@"]) as cursor:
+                    parent_keys = dict(cursor)
+            cursor = arcpy.da.InsertCursor(attach_table, [rel_field, "CONTENT_TYPE", "ATT_NAME", "DATA_SIZE", "DATA"])
+
+        self._emit(f"Loadin' {len(jobs)} attachments straight into {attach_table}")
+        job_iter = iter(jobs)
+        window = self.max_concurrent_attachments * 2
+        loaded = 0
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_attachments) as executor:
+                pending = {executor.submit(_read, job) for job in itertools.islice(job_iter, window)}
+                while pending:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        (parent_oid, _, info), data = future.result()
+                        rel_value = parent_keys.get(parent_oid) if parent_keys is not None else parent_oid
+                        if rel_value is None:
+                            self._emit(f"No local feature for attachment parent {parent_oid}, skippin'", severity=1)
+                            continue
+                        att_name = info.get("name") or f"attachment_{info.get('id')}"
+                        with self._arcpy_lock:
+                            cursor.insertRow((rel_value, info.get("contentType"), att_name, len(data), memoryview(data)))
+                        loaded += 1
+                        if loaded % 500 == 0:
+                            self._emit(f"{loaded} of {len(jobs)} attachments stowed")
+                    for job in itertools.islice(job_iter, len(done)):
+                        pending.add(executor.submit(_read, job))
+        finally:
+            with self._arcpy_lock:
+                del cursor
+            if store is not None:
+                store.save()
+
+        self._emit(f"{loaded} attachments added to {final_fc}")
+
+    def download_attachments(self, downloads, store=None):
+        """Download (parent_oid, url, out_file, attachment id, size) jobs on up to max_concurrent_attachments threads.
+
+        With a store, attachments already held at the same size are linked
+        into place instead of downloaded.
+        """
+
+        def _fetch(job):
+            parent_oid, url, out_file, att_id, size = job
+            if store is not None:
+                held = store.lookup(parent_oid, att_id, size)
+                if held:
+                    store.link(held, out_file)
+                    return False
+            digest = self.download_file(url, out_file)
+            if store is not None:
+                store.add(parent_oid, att_id, size, out_file, digest)
+            return True
+
+        reused = 0
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_attachments) as executor:
+                futures = [executor.submit(_fetch, job) for job in downloads]
+                try:
+                    for done_count, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                        if not future.result():
+                            reused += 1
+                        if done_count % 500 == 0:
+                            self._emit(f"{done_count} of {len(downloads)} attachments hauled aboard")
+                except BaseException:
+                    # One failure sinks the step; don't sit through the rest of the queue first.
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+        finally:
+            if store is not None:
+                store.save()
+
+        if store is not None:
+            self._emit(f"{len(downloads) - reused} attachments downloaded, {reused} already in the store")
+
     def make_service_name(self, service_info, output_workspace):
         max_path_length = 259
         if self.output_type == "Folder":
@@ -472,6 +1446,27 @@ class DataPillagerRunner:
 
         return service_name_cl
 
+    def _conversion_pool(self):
+        """The run's conversion process pool, started on first use."""
+        with self._convert_pool_lock:
+            if self.convert_pool is None:
+                self.convert_pool = datapillager_convert.create_pool(
+                    self.conversion_processes,
+                    overwrite_output=self.overwrite_output,
+                    preserve_global_ids=self.preserve_global_ids,
+                )
+                self._emit(f"Convertin' on {self.conversion_processes} processes while the next chunks download")
+            return self.convert_pool
+
+    def _close_conversion_pool(self):
+        if self.convert_pool is None:
+            return
+        self.convert_pool.shutdown(wait=True, cancel_futures=True)
+        self.convert_pool = None
+        for folder, prefix in self._scratch_to_clear:
+            self.scrub_the_decks(datapillager_convert.scratch_workspaces(folder, prefix))
+        self._scratch_to_clear = []
+
     def scrub_the_decks(self, fc_list):
         for fc in fc_list:
             try:
@@ -480,7 +1475,626 @@ class DataPillagerRunner:
             except Exception as ex:
                 self._emit(f"Warning: Could not delete {fc}: {ex}", severity=1)
 
-    def pillage_the_layer(self, slyr, token, output_folder, output_workspace):
+    def get_layer_info(self, slyr, token):
+        json_param = {"f": "json"}
+        if token:
+            json_param["token"] = token
+        # Incremental sync needs the live editingInfo.lastEditDate, so it always goes to the server.
+        service_info = dict(self.execute_query(slyr, params=json_param, use_cache=not self.incremental_sync))
+        if not service_info.get("error"):
+            service_info["serviceURL"] = slyr
+        return service_info
+
+    @staticmethod
+    def _checkpoint_paths(output_folder, service_name_cl):
+        manifest_file = os.path.join(output_folder, f"{service_name_cl}_checkpoint.json")
+        oid_file = os.path.join(output_folder, f"{service_name_cl}_checkpoint_oids.json")
+        return manifest_file, oid_file
+
+    @staticmethod
+    def _write_json_atomic(path, data):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(datapillager_json.dump_bytes(data))
+        os.replace(temp_path, path)
+
+    def _new_checkpoint(self, output_folder, service_name_cl, slyr, strategy, feature_oids, max_record_count, chunks):
+        """Write a fresh checkpoint manifest for this layer and return it.
+
+        The OID list goes to its own file, written once, so the per-chunk
+        manifest rewrites stay small.
+        """
+        manifest_file, oid_file = self._checkpoint_paths(output_folder, service_name_cl)
+        if feature_oids is not None:
+            self._write_json_atomic(oid_file, feature_oids)
+        checkpoint = {
+            "serviceURL": slyr,
+            "where": self.query_str,
+            "strategy": strategy,
+            "maxRecordCount": max_record_count,
+            "chunks": [chunk["bounds"] for chunk in chunks],
+            "committed": {},
+            "manifestFile": manifest_file,
+            "oidFile": oid_file,
+        }
+        self._write_json_atomic(manifest_file, checkpoint)
+        return checkpoint
+
+    def _load_checkpoint(self, output_folder, service_name_cl, slyr):
+        manifest_file, oid_file = self._checkpoint_paths(output_folder, service_name_cl)
+        if not os.path.isfile(manifest_file):
+            return None
+
+        try:
+            with open(manifest_file, "rb") as handle:
+                checkpoint = datapillager_json.loads(handle.read())
+            if checkpoint.get("strategy", "objectids") == "objectids":
+                with open(oid_file, "rb") as handle:
+                    checkpoint["objectIds"] = datapillager_json.loads(handle.read())
+        except (OSError, ValueError) as ex:
+            self._emit(f"Checkpoint for {service_name_cl} be unreadable, startin' fresh: {ex}", severity=1)
+            return None
+
+        if checkpoint.get("serviceURL") != slyr or checkpoint.get("where") != self.query_str:
+            self._emit(f"Checkpoint for {service_name_cl} be for a different query, startin' fresh", severity=1)
+            return None
+
+        checkpoint["manifestFile"] = manifest_file
+        checkpoint["oidFile"] = oid_file
+        return checkpoint
+
+    def _committed_checkpoint_chunks(self, checkpoint, chunks, final_fc, use_stream_writer):
+        """Return {chunk index: commit record} for chunks that can be skipped on resume."""
+        if checkpoint["chunks"] != [chunk["bounds"] for chunk in chunks]:
+            self._emit("Checkpoint chunk boundaries don't match, refetchin' everything", severity=1)
+            checkpoint["committed"] = {}
+            return {}
+
+        committed = {int(idx): record for idx, record in checkpoint["committed"].items()}
+        with self._arcpy_lock:
+            if use_stream_writer:
+                # Rows only count once the cursor released them; anything else means a partial chunk.
+                expected = sum(record["count"] for record in committed.values())
+                if not committed or not arcpy.Exists(final_fc) or int(arcpy.GetCount_management(final_fc)[0]) != expected:
+                    committed = {}
+            else:
+                committed = {
+                    idx: record
+                    for idx, record in committed.items()
+                    if record.get("output") and arcpy.Exists(record["output"])
+                }
+
+        checkpoint["committed"] = {str(idx): record for idx, record in committed.items()}
+        return committed
+
+    def _commit_checkpoint_chunk(self, checkpoint, chunk_index, feature_count, output=None):
+        checkpoint["committed"][str(chunk_index)] = {"count": feature_count, "output": output}
+        manifest = {key: value for key, value in checkpoint.items() if key != "objectIds"}
+        self._write_json_atomic(checkpoint["manifestFile"], manifest)
+
+    def _clear_checkpoint(self, checkpoint):
+        for path in (checkpoint["manifestFile"], checkpoint["oidFile"]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _sync_key_field(service_info):
+        """Return the GlobalID field used to match local rows to server features, if any."""
+        if service_info.get("globalIdField"):
+            return service_info["globalIdField"]
+        for field in service_info.get("fields") or []:
+            if field.get("type") == "esriFieldTypeGlobalID":
+                return field.get("name")
+        return None
+
+    @staticmethod
+    def _normalize_sync_key(value):
+        if value is None:
+            return None
+        return str(value).strip("{}").lower()
+
+    @staticmethod
+    def _sync_state_path(output_folder, service_name_cl):
+        return os.path.join(output_folder, f"{service_name_cl}_sync.json")
+
+    def _save_sync_state(self, output_folder, service_name_cl, slyr, service_info, sync_keys):
+        sync_state = {
+            "serviceURL": slyr,
+            "where": self.query_str,
+            "lastEditDate": (service_info.get("editingInfo") or {}).get("lastEditDate"),
+            "objectIds": sync_keys,
+        }
+        self._write_json_atomic(self._sync_state_path(output_folder, service_name_cl), sync_state)
+
+    def _load_sync_state(self, output_folder, service_name_cl, slyr):
+        sync_file = self._sync_state_path(output_folder, service_name_cl)
+        if not os.path.isfile(sync_file):
+            return None
+        try:
+            with open(sync_file, "rb") as handle:
+                sync_state = datapillager_json.loads(handle.read())
+        except (OSError, ValueError) as ex:
+            self._emit(f"Sync state for {service_name_cl} be unreadable: {ex}", severity=1)
+            return None
+        if sync_state.get("serviceURL") != slyr or sync_state.get("where") != self.query_str:
+            return None
+        return sync_state
+
+    def sync_the_layer(
+        self, slyr, token, service_info, objectid_field, key_field, final_fc, output_folder, service_name_cl, query_format="json"
+    ):
+        """Bring final_fc up to date with features edited since the last sync.
+
+        Returns a result string when the layer was synced or skipped, or None
+        when a full download is needed instead. Deletes and inserts run in one
+        edit operation, so a failure leaves final_fc as it was.
+        """
+        if self.output_type == "Folder":
+            self._emit("Incremental sync needs a geodatabase output, doing a full download", severity=1)
+            return None
+
+        last_edit_date = (service_info.get("editingInfo") or {}).get("lastEditDate")
+        edit_date_field = (service_info.get("editFieldsInfo") or {}).get("editDateField")
+        if not last_edit_date or not key_field:
+            self._emit("No editingInfo or GlobalID on this layer, it be a full download for incremental sync", severity=1)
+            return None
+
+        sync_state = self._load_sync_state(output_folder, service_name_cl, slyr)
+        with self._arcpy_lock:
+            final_fc_exists = arcpy.Exists(final_fc)
+        if sync_state is None or not final_fc_exists:
+            return None
+
+        if sync_state.get("lastEditDate") == last_edit_date:
+            msg = f"{slyr} unchanged since last sync, nothin' to plunder"
+            self._emit(msg)
+            return f"Skipped: {msg}"
+
+        if not edit_date_field:
+            self._emit("Layer has no editDateField, it be a full download for incremental sync", severity=1)
+            return None
+
+        base_where = self.query_str or "1=1"
+        id_params = {"where": base_where, "returnIdsOnly": "true", "f": "json"}
+        if token:
+            id_params["token"] = token
+        current_ids = self.execute_query(f"{slyr}/query", params=id_params).get("objectIds")
+        if current_ids is None:
+            return None
+
+        known_keys = sync_state.get("objectIds") or {}
+        current_set = {str(oid) for oid in current_ids}
+        deleted_oids = [oid for oid in known_keys if oid not in current_set]
+
+        since = datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=sync_state.get("lastEditDate") or 0)
+        changed_params = dict(id_params)
+        changed_params["where"] = f"({base_where}) AND {edit_date_field} >= timestamp '{since:%Y-%m-%d %H:%M:%S}'"
+        changed_ids = self.execute_query(f"{slyr}/query", params=changed_params).get("objectIds")
+        if changed_ids is None:
+            return None
+        changed_oids = sorted({int(oid) for oid in changed_ids} | {int(oid) for oid in current_set if oid not in known_keys})
+
+        self._emit(f"Syncin' {slyr}: {len(changed_oids)} changed, {len(deleted_oids)} deleted")
+
+        # Same params as a full download, so synced rows match downloaded ones.
+        feat_params_base = self._feature_query_params(token, query_format)
+        feat_params_base["where"] = base_where
+        chunks = []
+        for oid_batch in self.chunk_list(changed_oids, 250):
+            params = dict(feat_params_base)
+            params["objectIds"] = ",".join(str(oid) for oid in oid_batch)
+            chunks.append({"label": f"oids {oid_batch[0]} to {oid_batch[-1]}", "params": params})
+
+        changed_features = []
+        for chunk, response in self.iter_chunk_responses(f"{slyr}/query", chunks):
+            features = response.get("features") if response else None
+            if features is None:
+                raise DataPillagerError("Abandon ship! Sync access failed for one or more feature chunks")
+            changed_features.extend(features)
+
+        stale_keys = {self._normalize_sync_key(known_keys[oid]) for oid in deleted_oids if known_keys.get(oid)}
+        for feature in changed_features:
+            attributes = feature.get("attributes") or {}
+            oid = str(attributes.get(objectid_field))
+            if known_keys.get(oid):
+                stale_keys.add(self._normalize_sync_key(known_keys[oid]))
+            stale_keys.add(self._normalize_sync_key(attributes.get(key_field)))
+        stale_keys.discard(None)
+
+        try:
+            with self._arcpy_lock:
+                # The edit operation is rolled back if the insert fails or the counts don't match.
+                with arcpy.da.Editor(os.path.dirname(final_fc)):
+                    with arcpy.da.UpdateCursor(final_fc, [key_field]) as cursor:
+                        for row in cursor:
+                            if self._normalize_sync_key(row[0]) in stale_keys:
+                                cursor.deleteRow()
+
+                    stream_writer = self._open_stream_writer(final_fc, service_info, None, append=True)
+                    try:
+                        self._write_stream_features(stream_writer, changed_features)
+                    finally:
+                        del stream_writer["cursor"]
+
+                    data_count = int(arcpy.GetCount_management(final_fc)[0])
+                    if data_count != len(current_set):
+                        raise DataPillagerError(
+                            f"Sync would leave {data_count} features but the service has {len(current_set)}; "
+                            f"{final_fc} left as it was, the next run will do a full download."
+                        )
+        except Exception:
+            os.remove(self._sync_state_path(output_folder, service_name_cl))
+            raise
+
+        for oid in deleted_oids:
+            known_keys.pop(oid, None)
+        for feature in changed_features:
+            attributes = feature.get("attributes") or {}
+            known_keys[str(attributes.get(objectid_field))] = attributes.get(key_field)
+        self._save_sync_state(output_folder, service_name_cl, slyr, service_info, known_keys)
+
+        msg = f"{slyr} synced to {final_fc}: {len(changed_features)} upserted, {len(deleted_oids)} deleted"
+        self._emit(msg)
+        return f"Success: {msg}"
+
+    def _feature_query_params(self, token, query_format):
+        """Base params for feature data queries, shared by full downloads and incremental syncs."""
+        params = {
+            "outFields": "*",
+            "returnGeometry": "true",
+            "returnIdsOnly": "false",
+            "returnCountOnly": "false",
+            "returnExtentOnly": "false",
+            "spatialRel": "esriSpatialRelIntersects",
+            "units": "esriSRUnit_Meter",
+            "returnZ": "false",
+            "returnM": "false",
+            "f": query_format,
+        }
+        if token:
+            params["token"] = token
+        params.update(self._generalization_params())
+        return params
+
+    def _generalization_params(self):
+        """Query params requesting reduced geometry, in the layer's own spatial reference."""
+        params = {}
+        if self.max_allowable_offset > 0:
+            params["maxAllowableOffset"] = self.max_allowable_offset
+        if self.geometry_precision not in (None, ""):
+            params["geometryPrecision"] = int(self.geometry_precision)
+        if self.quantization_tolerance > 0:
+            # No outSR is sent, so edit mode quantizes in the layer's native coordinate system.
+            params["quantizationParameters"] = json.dumps(
+                {"mode": "edit", "originPosition": "upperLeft", "tolerance": self.quantization_tolerance}
+            )
+        if params:
+            self._emit(f"Requestin' generalized geometry: {', '.join(sorted(params))}")
+        return params
+
+    def _choose_chunk_strategy(self, service_info, checkpoint):
+        """Pick how a layer is split into chunk queries: "objectids", "pagination" or "statistics".
+
+        "auto" starts with the OID list, whose ranges stay correct while the
+        layer is being edited. pillage_the_layer switches it to pagination
+        only when the OID query fails or hits the server's limit.
+        """
+        if checkpoint is not None:
+            return checkpoint.get("strategy", "objectids")
+
+        advanced_query = service_info.get("advancedQueryCapabilities") or {}
+        supports_statistics = bool(service_info.get("supportsStatistics") or advanced_query.get("supportsStatistics"))
+        if self.chunk_strategy == "statistics":
+            if supports_statistics and service_info.get("FeatureCount") is not None:
+                return "statistics"
+            self._emit("Layer doesn't support statistics, fetchin' the OID list instead", severity=1)
+            return "objectids"
+        if self.chunk_strategy == "pagination":
+            if self._can_paginate(service_info):
+                return "pagination"
+            self._emit("Layer doesn't support pagination, fetchin' the OID list instead", severity=1)
+        return "objectids"
+
+    @staticmethod
+    def _can_paginate(service_info):
+        advanced_query = service_info.get("advancedQueryCapabilities") or {}
+        return bool(advanced_query.get("supportsPagination")) and service_info.get("FeatureCount") is not None
+
+    def _query_object_ids(self, slyr, token, objectid_field):
+        """Return the layer's OIDs, or None if the query fails."""
+        return self._query_object_id_list(slyr, token, objectid_field)[0]
+
+    def _query_object_id_list(self, slyr, token, objectid_field):
+        """Return (OIDs or None if the query fails, whether the server cut the list short)."""
+        if self.query_str:
+            where_clause = self.query_str
+        else:
+            where_clause = f"{objectid_field} > 0"
+
+        oid_params = {
+            "where": where_clause,
+            "returnGeometry": "false",
+            "returnIdsOnly": "true",
+            "returnCountOnly": "false",
+            "returnExtentOnly": "false",
+            "f": "json",
+        }
+        if token:
+            oid_params["token"] = token
+
+        feature_oid_query = self.execute_query(f"{slyr}/query", params=oid_params)
+        if not feature_oid_query:
+            return None, False
+        return feature_oid_query.get("objectIds"), bool(feature_oid_query.get("exceededTransferLimit"))
+
+    def _query_oid_range(self, slyr, token, objectid_field):
+        """Return (min OID, max OID) from an outStatistics query, or None if the server can't say."""
+        out_statistics = [
+            {"statisticType": "min", "onStatisticField": objectid_field, "outStatisticFieldName": "MIN_OID"},
+            {"statisticType": "max", "onStatisticField": objectid_field, "outStatisticFieldName": "MAX_OID"},
+        ]
+        stats_params = {
+            "where": self.query_str or "1=1",
+            "outStatistics": json.dumps(out_statistics),
+            "f": "json",
+        }
+        if token:
+            stats_params["token"] = token
+
+        stats_query = self.execute_query(f"{slyr}/query", params=stats_params)
+        features = stats_query.get("features") or []
+        if not features:
+            return None
+
+        # Some servers upper-case the out field names
+        attributes = {key.upper(): value for key, value in (features[0].get("attributes") or {}).items()}
+        min_oid = attributes.get("MIN_OID")
+        max_oid = attributes.get("MAX_OID")
+        if min_oid is None or max_oid is None:
+            return None
+        return int(min_oid), int(max_oid)
+
+    def _oid_span_chunks(self, min_oid, max_oid, max_record_count, objectid_field, params_base):
+        """Build OID range chunks arithmetically from the min and max OID.
+
+        Sparse layers produce some empty ranges, so these chunks are allowed
+        to come back without features.
+        """
+        chunks = []
+        for chunk_index, start_oid in enumerate(range(min_oid, max_oid + 1, max_record_count)):
+            end_oid = min(start_oid + max_record_count - 1, max_oid)
+            params = params_base.copy()
+            params["where"] = self._oid_range_where(objectid_field, start_oid, end_oid)
+            chunks.append(
+                {
+                    "index": chunk_index,
+                    "kind": "span",
+                    "objectid_field": objectid_field,
+                    "bounds": [start_oid, end_oid],
+                    "label": f"oids {start_oid} to {end_oid}",
+                    "params": params,
+                    "may_be_empty": True,
+                }
+            )
+        return chunks
+
+    def _spool_chunk(self, query_url, chunk, out_json_file, key_fields=None):
+        """Stream one chunk's features from the socket straight into out_json_file.
+
+        Nothing larger than a single feature is held in memory. Returns a
+        summary in place of the response: featuresFile, featureCount, header
+        (every top-level key except features) and, with key_fields
+        (OID field, key field), the (OID, key) pair of each feature.
+        """
+        params = self._fresh_token_params(chunk["params"])
+        for attempt in (1, 2):
+            header = {}
+            keys = [] if key_fields else None
+            decoded_bytes = 0
+
+            def _blocks(response):
+                nonlocal decoded_bytes
+                for block in response.iter_content(chunk_size=self.download_block_size):
+                    decoded_bytes += len(block)
+                    yield block
+
+            try:
+                with self._request_slots:
+                    if self._use_post(query_url, params):
+                        response = self.session.post(query_url, data=params, stream=True, timeout=self.request_timeout)
+                    else:
+                        response = self.session.get(query_url, params=params, stream=True, timeout=self.request_timeout)
+                    with response:
+                        if response.status_code in (498, 499):
+                            header["error"] = {"code": response.status_code, "message": "Invalid token"}
+                        else:
+                            response.raise_for_status()
+                            with codecs.open(out_json_file, "w", "utf-8") as handle:
+                                writer = FeatureFileWriter(handle)
+                                for key, value in iter_feature_collection(_blocks(response)):
+                                    if key is FEATURE:
+                                        writer.feature(value)
+                                        if keys is not None:
+                                            attributes = value.get("attributes") or {}
+                                            keys.append((attributes.get(key_fields[0]), attributes.get(key_fields[1])))
+                                    elif key == "transform":
+                                        raise StreamParseError("Quantized geometries can't be spooled as they arrive")
+                                    else:
+                                        header[key] = value
+                                        writer.header(key, value)
+                                writer.close()
+                            self._record_transfer(query_url, response, decoded_bytes)
+            except (requests.RequestException, ValueError, OSError) as ex:
+                header = {"error": str(ex)}
+
+            if header.get("error") is None:
+                return {"featuresFile": out_json_file, "featureCount": writer.count, "header": header, "keys": keys}
+            if os.path.exists(out_json_file):
+                os.remove(out_json_file)
+            if attempt == 1 and self._token_rejected(header, params) and self.token_manager.refresh(params["token"]):
+                params = self._fresh_token_params(params)
+                continue
+            return {"error": header["error"]}
+
+    def _iter_spooled_features(self, spooled_file):
+        """Read features back from a file written by _spool_chunk, one at a time."""
+        with open(spooled_file, "rb") as spool:
+            blocks = iter(lambda: spool.read(self.download_block_size), b"")
+            for key, value in iter_feature_collection(blocks):
+                if key is FEATURE:
+                    yield value
+
+    def _oid_list_params(self, params, oids):
+        """Select exactly oids with an objectIds list; the where clause only carries the user's filter."""
+        params["objectIds"] = ",".join(str(oid) for oid in oids)
+        params["where"] = self.query_str or "1=1"
+        return params
+
+    def _oid_range_where(self, objectid_field, start_oid, end_oid):
+        if self.query_str:
+            return f"{self.query_str} AND {objectid_field} >= {start_oid} AND {objectid_field} <= {end_oid}"
+        return f"{objectid_field} >= {start_oid} AND {objectid_field} <= {end_oid}"
+
+    def _sub_chunk_params(self, chunk, lo, hi):
+        """Params for units lo..hi-1 of a chunk: OID list positions, OID values or record offsets."""
+        params = chunk["params"].copy()
+        start = chunk["bounds"][0]
+        if chunk["kind"] == "page":
+            params["resultOffset"] = start + lo
+            params["resultRecordCount"] = hi - lo
+        elif chunk["kind"] == "oids" and "objectIds" in params:
+            self._oid_list_params(params, chunk["oids"][lo:hi])
+        elif chunk["kind"] == "oids":
+            params["where"] = self._oid_range_where(chunk["objectid_field"], chunk["oids"][lo], chunk["oids"][hi - 1])
+        else:
+            params["where"] = self._oid_range_where(chunk["objectid_field"], start + lo, start + hi - 1)
+        return params
+
+    def _fetch_chunk_adaptive(self, query_url, chunk, sizer):
+        """Fetch one planned chunk in batches sized by sizer and merge them into one response.
+
+        Timeouts, server errors and exceededTransferLimit shrink the batch and
+        retry; fast, small responses let it grow back up to the chunk size.
+        """
+        if chunk["kind"] == "oids":
+            unit_count = len(chunk["oids"])
+        else:
+            unit_count = chunk["bounds"][1] - chunk["bounds"][0] + 1
+
+        merged = None
+        position = 0
+        while position < unit_count:
+            end = min(position + sizer.size, unit_count)
+            params = self._sub_chunk_params(chunk, position, end)
+            started = time.monotonic()
+            try:
+                response, nbytes = self._get_json(query_url, params=params)
+            except requests.RequestException as ex:
+                if not self._is_timeout(ex):
+                    return {"error": str(ex)}
+                if sizer.shrink():
+                    self._emit(f"Request timed out, shrinkin' batches to {sizer.size}", severity=1)
+                    continue
+                return {"error": f"Timed out even at {sizer.size} records per request"}
+            elapsed = time.monotonic() - started
+
+            if response.get("error") or (chunk["kind"] != "page" and response.get("exceededTransferLimit")):
+                if sizer.shrink():
+                    self._emit(f"Server balked, shrinkin' batches to {sizer.size}", severity=1)
+                    continue
+                if response.get("error"):
+                    return response
+                return {"error": f"exceededTransferLimit even at {sizer.size} records per request"}
+
+            batch = response.get("features") or []
+            sizer.record(len(batch), elapsed, nbytes)
+            if merged is None:
+                merged = response
+                merged["features"] = []
+            merged["features"].extend(batch)
+
+            if chunk["kind"] == "page":
+                # A short page means the server capped it below what we asked for; carry on from there.
+                if not batch:
+                    break
+                position += len(batch)
+            else:
+                position = end
+
+        if merged is None:
+            merged = {"features": []}
+        merged.pop("exceededTransferLimit", None)
+        return merged
+
+    @staticmethod
+    def _is_timeout(ex):
+        """True for a timeout, including read timeouts urllib3 retried and then raised as a ConnectionError."""
+        if isinstance(ex, requests.Timeout):
+            return True
+        reason = getattr(ex.args[0], "reason", None) if ex.args else None
+        return isinstance(reason, ReadTimeoutError)
+
+    def _oid_range_chunks(
+        self, feature_oids, max_record_count, objectid_field, params_base, keep_oids=False, by_object_ids=False
+    ):
+        """Build OID range chunks from a sorted OID list.
+
+        With by_object_ids each chunk names its OIDs in an objectIds list
+        rather than a range, so sparse layers fetch exactly the rows needed.
+        """
+        chunks = []
+        for chunk_index, group in enumerate(self.grouper(feature_oids, max_record_count)):
+            start_oid = group[0]
+            end_oid = group[max_record_count - 1]
+            if end_oid is None:
+                for value in reversed(group):
+                    if value is not None:
+                        end_oid = value
+                        break
+
+            params = params_base.copy()
+            oids = [value for value in group if value is not None]
+            if by_object_ids:
+                self._oid_list_params(params, oids)
+            else:
+                params["where"] = self._oid_range_where(objectid_field, start_oid, end_oid)
+            chunk = {
+                "index": chunk_index,
+                "kind": "oids",
+                "objectid_field": objectid_field,
+                "bounds": [start_oid, end_oid],
+                "label": f"oids {start_oid} to {end_oid}",
+                "params": params,
+            }
+            if keep_oids or by_object_ids:
+                chunk["oids"] = oids
+            chunks.append(chunk)
+        return chunks
+
+    def _pagination_chunks(self, record_count, max_record_count, objectid_field, params_base):
+        """Build resultOffset/resultRecordCount pages ordered by the OID field."""
+        chunks = []
+        for chunk_index, offset in enumerate(range(0, record_count, max_record_count)):
+            params = params_base.copy()
+            params["where"] = self.query_str or "1=1"
+            params["orderByFields"] = objectid_field
+            params["resultOffset"] = offset
+            params["resultRecordCount"] = max_record_count
+            end_record = min(offset + max_record_count, record_count) - 1
+            chunks.append(
+                {
+                    "index": chunk_index,
+                    "kind": "page",
+                    "bounds": [offset, end_record],
+                    "label": f"records {offset} to {end_record}",
+                    "params": params,
+                }
+            )
+        return chunks
+
+    def pillage_the_layer(self, slyr, token, output_folder, output_workspace, service_info=None, service_name_cl=None):
         try:
             downloaded_fc_list = []
             current_iter = 0
@@ -490,28 +2104,33 @@ class DataPillagerRunner:
 
             self._emit(f"Now pillagin' yer data from {slyr}")
 
-            json_param = {"f": "json"}
-            if token:
-                json_param["token"] = token
-            service_info = self.execute_query(slyr, params=json_param)
+            if service_info is None:
+                service_info = self.get_layer_info(slyr, token)
 
             if service_info.get("error"):
                 return f"Error: {service_info.get('error')}"
 
-            service_info["serviceURL"] = slyr
+            supported = service_info.get("supportedQueryFormats")
+            supported_formats = [f.strip().upper() for f in supported.split(",")] if supported else []
 
             supports_json = True
             if self.strict_mode:
                 supports_json = False
-                supported = service_info.get("supportedQueryFormats")
                 if supported:
-                    for data_format in [f.strip() for f in supported.split(",")]:
+                    for data_format in supported_formats:
                         if data_format == "JSON":
                             supports_json = True
                             break
                 else:
                     self._emit("Strict mode scuttled, no supported formats, forgin' on", severity=1)
 
+            query_format = "json"
+            if self.use_pbf:
+                if "PBF" in supported_formats:
+                    query_format = "pbf"
+                else:
+                    self._emit("Layer doesn't offer PBF, fallin' back to JSON", severity=1)
+
             objectid_field = "OBJECTID"
             field_list = service_info.get("fields")
             if field_list:
@@ -527,13 +2146,21 @@ class DataPillagerRunner:
             feature_count = self.execute_query(f"{slyr}/query", params=ct_params)
             service_info["FeatureCount"] = feature_count.get("count")
 
-            service_name_cl = self.make_service_name(service_info, output_workspace)
+            if service_name_cl is None:
+                with self._arcpy_lock:
+                    service_name_cl = self.make_service_name(service_info, output_workspace)
             if self.output_type == "Folder":
                 final_fc = os.path.join(output_workspace, f"{service_name_cl}.shp")
             else:
                 final_fc = os.path.join(output_workspace, service_name_cl)
 
-            if arcpy.Exists(final_fc) and not self.overwrite_output:
+            checkpoint = None
+            if self.resume:
+                checkpoint = self._load_checkpoint(output_folder, service_name_cl, slyr)
+
+            with self._arcpy_lock:
+                final_fc_exists = arcpy.Exists(final_fc)
+            if final_fc_exists and not self.overwrite_output and checkpoint is None:
                 return f"Skipped: {final_fc} exists and overwrite output is disabled"
 
             if self.write_service_info:
@@ -545,115 +2172,309 @@ class DataPillagerRunner:
             if not supports_json:
                 return "Failed: Service does not support JSON output"
 
-            if self.query_str:
-                where_clause = self.query_str
-            else:
-                where_clause = f"{objectid_field} > 0"
-
-            oid_params = {
-                "where": where_clause,
-                "returnGeometry": "false",
-                "returnIdsOnly": "true",
-                "returnCountOnly": "false",
-                "returnExtentOnly": "false",
-                "f": "json",
-            }
-            if token:
-                oid_params["token"] = token
+            sync_key_field = None
+            sync_keys = None
+            if self.incremental_sync:
+                # GlobalIDs are the only stable key between server and local rows
+                if self.preserve_global_ids:
+                    sync_key_field = self._sync_key_field(service_info)
+                sync_result = self.sync_the_layer(
+                    slyr,
+                    token,
+                    service_info,
+                    objectid_field,
+                    sync_key_field,
+                    final_fc,
+                    output_folder,
+                    service_name_cl,
+                    query_format=query_format,
+                )
+                if sync_result:
+                    return sync_result
+                if sync_key_field and (service_info.get("editingInfo") or {}).get("lastEditDate"):
+                    sync_keys = {}
 
             max_record_count = service_info.get("maxRecordCount") or self.sanity_max_record_count
-            if max_record_count > self.sanity_max_record_count:
+            if max_record_count > self.sanity_max_record_count and self.adaptive_chunk_size:
+                self._emit(
+                    f"{max_record_count} max records is a wee bit large, startin' at {self.sanity_max_record_count} and adaptin' from there"
+                )
+            elif max_record_count > self.sanity_max_record_count:
                 self._emit(
                     f"{max_record_count} max records is a wee bit large, using {self.sanity_max_record_count} instead..."
                 )
                 max_record_count = self.sanity_max_record_count
 
-            feature_oid_query = self.execute_query(f"{slyr}/query", params=oid_params)
-            feature_oids = feature_oid_query.get("objectIds") if feature_oid_query else None
+            chunk_strategy = self._choose_chunk_strategy(service_info, checkpoint)
+            feature_oids = None
+            if checkpoint is not None:
+                feature_oids = checkpoint.get("objectIds")
+                max_record_count = checkpoint["maxRecordCount"]
+                self._emit(
+                    f"Resumin' from checkpoint, {len(checkpoint['committed'])} of {len(checkpoint['chunks'])} sorties already done"
+                )
+
+            oid_range = None
+            if chunk_strategy == "statistics":
+                oid_range = self._query_oid_range(slyr, token, objectid_field)
+                if oid_range is None:
+                    self._emit("No OID statistics returned, fetchin' the OID list instead", severity=1)
+                    chunk_strategy = "objectids"
+                    checkpoint = None
+                elif oid_range[1] - oid_range[0] + 1 > (service_info.get("FeatureCount") or 0) * self.max_oid_span_ratio:
+                    # Mostly empty ranges would cost a request each; the OID list is cheaper.
+                    self._emit(
+                        f"OIDs {oid_range[0]} to {oid_range[1]} be too sparse for {service_info.get('FeatureCount')} "
+                        "records, fetchin' the OID list instead",
+                        severity=1,
+                    )
+                    chunk_strategy = "objectids"
+                    oid_range = None
+                    checkpoint = None
+
+            if chunk_strategy == "objectids" and feature_oids is None:
+                feature_oids, oids_truncated = self._query_object_id_list(slyr, token, objectid_field)
+                auto_strategy = checkpoint is None and self.chunk_strategy == "auto"
+                if (feature_oids is None or oids_truncated) and auto_strategy and self._can_paginate(service_info):
+                    self._emit("OID list query failed or hit the server limit, pagin' instead", severity=1)
+                    chunk_strategy = "pagination"
+                    feature_oids = None
+                elif oids_truncated:
+                    # Never mistake a cut-short list for the whole layer, let alone for an empty one.
+                    raise DataPillagerError(
+                        f"OID list truncated by server at {len(feature_oids or [])} OIDs and the layer can't be paged; "
+                        "use the Statistics chunk strategy or narrow the query"
+                    )
+
+            if chunk_strategy in ("pagination", "statistics"):
+                oid_count = service_info.get("FeatureCount") or 0
+            else:
+                oid_count = len(feature_oids or [])
 
-            if not feature_oids:
+            if not oid_count:
                 if self.create_empty_schema:
-                    self._create_empty_schema(final_fc, field_list, service_info)
+                    with self._arcpy_lock:
+                        self._create_empty_schema(final_fc, field_list, service_info)
                     return f"Success: Created empty feature class {final_fc}"
                 raise DataPillagerError("Plunderin' failed: no feature OIDs returned")
 
-            feat_data_params_base = {
-                "outFields": "*",
-                "returnGeometry": "true",
-                "returnIdsOnly": "false",
-                "returnCountOnly": "false",
-                "returnExtentOnly": "false",
-                "spatialRel": "esriSpatialRelIntersects",
-                "units": "esriSRUnit_Meter",
-                "returnZ": "false",
-                "returnM": "false",
-                "f": "json",
-            }
+            feat_data_params_base = self._feature_query_params(token, query_format)
 
-            oid_count = len(feature_oids)
-            sortie_count = oid_count // max_record_count + (oid_count % max_record_count > 0)
-            self._emit(f"{oid_count} records, in chunks of {max_record_count}, err, that be {sortie_count} sorties. Ready lads!")
-
-            feature_oids.sort()
-            for group in self.grouper(feature_oids, max_record_count):
-                start_oid = group[0]
-                end_oid = group[max_record_count - 1]
-                if end_oid is None:
-                    for value in reversed(group):
-                        if value is not None:
-                            end_oid = value
-                            break
+            if chunk_strategy == "pagination":
+                self._emit(f"Pagin' through the layer ordered by {objectid_field}")
+                chunks = self._pagination_chunks(oid_count, max_record_count, objectid_field, feat_data_params_base)
+            elif chunk_strategy == "statistics":
+                min_oid, max_oid = oid_range
+                self._emit(f"OIDs run from {min_oid} to {max_oid}, carvin' up the range without the OID list")
+                chunks = self._oid_span_chunks(min_oid, max_oid, max_record_count, objectid_field, feat_data_params_base)
+            else:
+                feature_oids.sort()
+                chunks = self._oid_range_chunks(
+                    feature_oids,
+                    max_record_count,
+                    objectid_field,
+                    feat_data_params_base,
+                    keep_oids=self.adaptive_chunk_size,
+                    by_object_ids=self.query_by_object_ids,
+                )
+            self._emit(f"{oid_count} records, in chunks of {max_record_count}, err, that be {len(chunks)} sorties. Ready lads!")
 
-                if self.query_str:
-                    where_clause = f"{self.query_str} AND {objectid_field} >= {start_oid} AND {objectid_field} <= {end_oid}"
-                else:
-                    where_clause = f"{objectid_field} >= {start_oid} AND {objectid_field} <= {end_oid}"
+            chunk_sizer = None
+            fetch_chunk = None
+            if self.adaptive_chunk_size:
+                chunk_sizer = AdaptiveChunkSizer(
+                    initial=min(max_record_count, self.sanity_max_record_count), maximum=max_record_count
+                )
 
-                params = feat_data_params_base.copy()
-                params["where"] = where_clause
-                if token:
-                    params["token"] = token
+                def fetch_chunk(chunk):
+                    return self._fetch_chunk_adaptive(f"{slyr}/query", chunk, chunk_sizer)
 
-                response = self.execute_query(f"{slyr}/query", params=params)
-                features = response.get("features") if response else None
-                if not features:
-                    raise DataPillagerError("Abandon ship! Data access failed for one or more feature chunks")
+            if self.streaming_parse and (query_format != "json" or self.adaptive_chunk_size or self.quantization_tolerance > 0):
+                # Quantized geometries have to be dequantized in memory before they can be written out.
+                self._emit(
+                    "Streamin' parse only handles fixed-size, unquantized JSON chunks, parsin' in memory instead",
+                    severity=1,
+                )
+            elif self.streaming_parse:
+                key_fields = (objectid_field, sync_key_field) if sync_keys is not None else None
 
-                out_json_name = f"{service_name_cl}{current_iter}.json"
-                out_json_file = os.path.join(output_folder, out_json_name)
-                with codecs.open(out_json_file, "w", "utf-8") as out_file:
-                    out_file.write(json.dumps(response, ensure_ascii=False))
+                def fetch_chunk(chunk):
+                    out_json_file = os.path.join(output_folder, f"{service_name_cl}{chunk['index']}.json")
+                    return self._spool_chunk(f"{slyr}/query", chunk, out_json_file, key_fields)
 
-                self._emit(f"Nabbed some json data fer ye: '{out_json_name}', oids {start_oid} to {end_oid}")
+            if self.max_concurrent_chunks > 1:
+                self._emit(f"Sendin' {self.max_concurrent_chunks} boarding parties at once")
 
-                if self.output_type == "Folder":
-                    out_file_name = f"{service_name_cl}{current_iter}.shp"
-                else:
-                    out_file_name = f"{service_name_cl}{current_iter}"
-                out_geofile = os.path.join(output_workspace, out_file_name)
+            use_stream_writer = self.stream_to_output
+            if use_stream_writer and self.output_type == "Folder":
+                self._emit("Streamin' needs a geodatabase, convertin' chunk by chunk instead", severity=1)
+                use_stream_writer = False
 
-                self._emit(f"Converting yer json to {out_geofile}")
-                arcpy.JSONToFeatures_conversion(out_json_file, out_geofile)
-                downloaded_fc_list.append(out_geofile)
-                os.remove(out_json_file)
-                current_iter += 1
+            committed_chunks = {}
+            if checkpoint is not None:
+                committed_chunks = self._committed_checkpoint_chunks(checkpoint, chunks, final_fc, use_stream_writer)
+            else:
+                checkpoint = self._new_checkpoint(
+                    output_folder, service_name_cl, slyr, chunk_strategy, feature_oids, max_record_count, chunks
+                )
 
-            if downloaded_fc_list:
-                self._emit(f"Stashin' all the booty in '{final_fc}'")
-                self.combine_data(fc_list=downloaded_fc_list, output_fc=final_fc)
+            for chunk_index in sorted(committed_chunks):
+                chunk_output = committed_chunks[chunk_index].get("output")
+                if chunk_output:
+                    downloaded_fc_list.append(chunk_output)
+            chunks_to_fetch = [chunk for chunk in chunks if chunk["index"] not in committed_chunks]
+
+            # Pipeline: chunks download in the background (iter_chunk_responses), convert in worker
+            # processes, and are committed and merged here in chunk order. Both hand-offs are bounded.
+            convert_pool = None
+            pending_conversions = collections.deque()
+            scratch_prefix = datapillager_convert.scratch_prefix(service_name_cl)
+            if self.conversion_processes and not use_stream_writer:
+                convert_pool = self._conversion_pool()
+
+            def _finish_conversion():
+                chunk_index, count, future = pending_conversions.popleft()
+                converted_fc = future.result()
+                downloaded_fc_list.append(converted_fc)
+                self._commit_checkpoint_chunk(checkpoint, chunk_index, count, converted_fc)
+
+            stream_writer = None
+            try:
+                if use_stream_writer and committed_chunks:
+                    with self._arcpy_lock:
+                        stream_writer = self._open_stream_writer(final_fc, service_info, None, append=True)
+
+                for chunk, response in self.iter_chunk_responses(f"{slyr}/query", chunks_to_fetch, fetch=fetch_chunk):
+                    current_iter = chunk["index"]
+                    # Streamed chunks arrive already spooled to disk; only a summary comes back.
+                    spooled_file = response.get("featuresFile") if response else None
+                    if spooled_file:
+                        features = None
+                        feature_count = response["featureCount"]
+                        header = response["header"]
+                    else:
+                        features = response.get("features") if response else None
+                        feature_count = len(features or [])
+                        header = response
+                        if query_format == "pbf" and response and response.get("fields"):
+                            self._merge_layer_fields(response, service_info)
+                    if not feature_count:
+                        if spooled_file:
+                            os.remove(spooled_file)
+                        has_result = spooled_file or features is not None
+                        if chunk.get("may_be_empty") and has_result and not response.get("error"):
+                            self._commit_checkpoint_chunk(checkpoint, current_iter, 0)
+                            continue
+                        raise DataPillagerError("Abandon ship! Data access failed for one or more feature chunks")
+
+                    if sync_keys is not None and spooled_file:
+                        for oid, key in response["keys"]:
+                            sync_keys[str(oid)] = key
+                    elif sync_keys is not None:
+                        for feature in features:
+                            attributes = feature.get("attributes") or {}
+                            sync_keys[str(attributes.get(objectid_field))] = attributes.get(sync_key_field)
+
+                    if use_stream_writer:
+                        with self._arcpy_lock:
+                            if stream_writer is None:
+                                stream_writer = self._open_stream_writer(final_fc, service_info, header)
+                            if spooled_file:
+                                self._write_stream_features(stream_writer, self._iter_spooled_features(spooled_file))
+                                os.remove(spooled_file)
+                            else:
+                                self._write_stream_features(stream_writer, features)
+                        self._emit(f"Stowed {feature_count} features in '{final_fc}', {chunk['label']}")
+                        self._commit_checkpoint_chunk(checkpoint, current_iter, feature_count)
+                        continue
 
-            if arcpy.Exists(final_fc):
-                data_count = int(arcpy.GetCount_management(final_fc)[0])
-                if data_count == oid_count:
-                    self._emit("Scrubbing the decks...")
-                    self.scrub_the_decks(downloaded_fc_list)
-                else:
-                    raise DataPillagerError(
-                        f"Splicin' the data failed - found {data_count} but expected {oid_count}. Check {final_fc}."
-                    )
+                    out_json_name = f"{service_name_cl}{current_iter}.json"
+                    out_json_file = os.path.join(output_folder, out_json_name)
+                    if not spooled_file:
+                        with open(out_json_file, "wb") as out_file:
+                            out_file.write(datapillager_json.dump_bytes(response))
+
+                    self._emit(f"Nabbed some json data fer ye: '{out_json_name}', {chunk['label']}")
+
+                    if convert_pool is not None:
+                        folder_output = self.output_type == "Folder"
+                        future = convert_pool.submit(
+                            datapillager_convert.convert_chunk,
+                            out_json_file,
+                            f"{service_name_cl}{current_iter}",
+                            output_workspace if folder_output else output_folder,
+                            scratch_prefix,
+                            folder_output,
+                        )
+                        pending_conversions.append((current_iter, feature_count, future))
+                        # Stop pulling downloads once every process has a chunk queued behind the one it is on.
+                        while len(pending_conversions) > self.conversion_processes * 2:
+                            _finish_conversion()
+                        continue
+
+                    if self.output_type == "Folder":
+                        out_file_name = f"{service_name_cl}{current_iter}.shp"
+                    else:
+                        out_file_name = f"{service_name_cl}{current_iter}"
+                    out_geofile = os.path.join(output_workspace, out_file_name)
+
+                    self._emit(f"Converting yer json to {out_geofile}")
+                    with self._arcpy_lock:
+                        arcpy.JSONToFeatures_conversion(out_json_file, out_geofile)
+                    downloaded_fc_list.append(out_geofile)
+                    os.remove(out_json_file)
+                    self._commit_checkpoint_chunk(checkpoint, current_iter, feature_count, out_geofile)
+
+                while pending_conversions:
+                    _finish_conversion()
+            finally:
+                if stream_writer is not None:
+                    with self._arcpy_lock:
+                        # releasing the cursor commits the rows and drops the schema lock
+                        del stream_writer["cursor"]
+                if pending_conversions:
+                    # The pool outlives this layer; drop its queued chunks and let running ones finish.
+                    for _, _, future in pending_conversions:
+                        future.cancel()
+                    concurrent.futures.wait([future for _, _, future in pending_conversions])
+
+            if chunk_sizer is not None and chunk_sizer.seconds:
+                self._emit(
+                    f"Hauled {chunk_sizer.throughput:.0f} features/s ({chunk_sizer.bytes / chunk_sizer.seconds / 1024:.0f} KB/s), "
+                    f"settled on {chunk_sizer.size} records per request"
+                )
 
-            if self.include_attachments and feature_oids:
-                self.get_attachments(slyr, final_fc, feature_oids, service_name_cl, output_folder, output_workspace, token)
+            with self._arcpy_lock:
+                if downloaded_fc_list:
+                    self._emit(f"Stashin' all the booty in '{final_fc}'")
+                    self.combine_data(fc_list=downloaded_fc_list, output_fc=final_fc)
+
+                if arcpy.Exists(final_fc):
+                    data_count = int(arcpy.GetCount_management(final_fc)[0])
+                    if data_count == oid_count:
+                        self._emit("Scrubbing the decks...")
+                        self.scrub_the_decks(downloaded_fc_list)
+                        if convert_pool is not None:
+                            # Pool workers may still hold these open; they go once the pool shuts down.
+                            self._scratch_to_clear.append((output_folder, scratch_prefix))
+                        else:
+                            self.scrub_the_decks(datapillager_convert.scratch_workspaces(output_folder, scratch_prefix))
+                        self._clear_checkpoint(checkpoint)
+                        if sync_keys is not None:
+                            if len(sync_keys) == oid_count:
+                                self._save_sync_state(output_folder, service_name_cl, slyr, service_info, sync_keys)
+                            else:
+                                self._emit("Resumed download, sync state not recorded until the next full run", severity=1)
+                    else:
+                        raise DataPillagerError(
+                            f"Splicin' the data failed - found {data_count} but expected {oid_count}. Check {final_fc}."
+                        )
+
+            if self.include_attachments:
+                if feature_oids is None:
+                    feature_oids = self._query_object_ids(slyr, token, objectid_field)
+                if feature_oids:
+                    self.get_attachments(slyr, final_fc, feature_oids, service_name_cl, output_folder, output_workspace, token)
 
             msg = f"{slyr} plundered to {final_fc} in {datetime.datetime.today() - slyr_start_time}"
             self._emit(msg)
@@ -661,26 +2482,91 @@ class DataPillagerRunner:
         except Exception as ex:
             self._emit(str(ex), severity=2)
             return f"Error: {ex}"
+        finally:
+            self._report_transfer(slyr)
+
+    def _report_transfer(self, slyr):
+        counts = self.transfer_stats.pop(f"{slyr}/query")
+        if not counts or not counts["decoded"]:
+            return
+        ratio = counts["decoded"] / max(1, counts["wire"])
+        measured = counts["responses"] - counts["unmeasured"]
+        msg = (
+            f"Transfer for {slyr}: {counts['wire'] / 1048576:.1f} MB on the wire, "
+            f"{counts['decoded'] / 1048576:.1f} MB decoded ({ratio:.1f}x), "
+            f"{counts['uncompressed']} of {measured} responses uncompressed"
+        )
+        if counts["unmeasured"]:
+            msg += f", {counts['unmeasured']} responses of unknown wire size left out"
+        self._emit(msg)
+
+    def pillage_the_layers(self, service_layers_to_get, token, output_folder, output_workspace):
+        """Pillage several layers at once, capped by max_concurrent_layers.
+
+        Layer metadata is fetched first and output names are reserved in
+        service order, so naming and the returned tracker do not depend on
+        which layer finishes first.
+        """
+        self._emit(f"Sendin' {self.max_concurrent_layers} ships out at once")
+        slyr_tracker = dict.fromkeys(service_layers_to_get)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_layers) as executor:
+            layer_infos = list(executor.map(lambda slyr: self.get_layer_info(slyr, token), service_layers_to_get))
+
+            futures = {}
+            for slyr, service_info in zip(service_layers_to_get, layer_infos):
+                service_name_cl = None
+                if not service_info.get("error"):
+                    try:
+                        # layers submitted earlier are already running arcpy
+                        with self._arcpy_lock:
+                            service_name_cl = self.make_service_name(service_info, output_workspace)
+                    except Exception as ex:
+                        # pillage_the_layer retries the name and reports the failure for this layer
+                        self._emit(f"Couldn't reserve an output name for {slyr}: {ex}", severity=1)
+                futures[slyr] = executor.submit(
+                    self.pillage_the_layer,
+                    slyr,
+                    token,
+                    output_folder,
+                    output_workspace,
+                    service_info=service_info,
+                    service_name_cl=service_name_cl,
+                )
+
+            for slyr, future in futures.items():
+                slyr_tracker[slyr] = future.result()
+
+        return slyr_tracker
 
     def _create_empty_schema(self, final_fc, field_list, service_info):
         final_fc_name = os.path.basename(final_fc)
         self._emit(f"No OID values found, creating an empty {final_fc_name} with schema")
 
-        esri_to_arcpy_geom = {
-            "esriGeometryPoint": "POINT",
-            "esriGeometryPolyline": "POLYLINE",
-            "esriGeometryPolygon": "POLYGON",
-        }
-        geometry_type = esri_to_arcpy_geom.get(service_info.get("geometryType"), "POINT")
-
         spatial_ref = None
         extent = service_info.get("extent") or {}
         sr_info = extent.get("spatialReference") or {}
         if "wkid" in sr_info:
             spatial_ref = arcpy.SpatialReference(sr_info["wkid"])
 
-        arcpy.CreateFeatureclass_management(self.output_workspace, final_fc_name, geometry_type, spatial_reference=spatial_ref)
+        self._create_schema(final_fc, field_list, service_info.get("geometryType"), spatial_ref)
+        self._emit(f"Created empty featureclass: {final_fc}")
+
+    def _create_schema(self, final_fc, field_list, esri_geometry_type, spatial_ref):
+        """Create final_fc with the service fields and return the fields that were added."""
+        esri_to_arcpy_geom = {
+            "esriGeometryPoint": "POINT",
+            "esriGeometryMultipoint": "MULTIPOINT",
+            "esriGeometryPolyline": "POLYLINE",
+            "esriGeometryPolygon": "POLYGON",
+        }
+        geometry_type = esri_to_arcpy_geom.get(esri_geometry_type, "POINT")
+
+        arcpy.CreateFeatureclass_management(
+            os.path.dirname(final_fc), os.path.basename(final_fc), geometry_type, spatial_reference=spatial_ref
+        )
 
+        added_fields = []
         if field_list:
             for field in field_list:
                 field_name = field.get("name")
@@ -699,14 +2585,101 @@ class DataPillagerRunner:
                     arcpy_type = "DOUBLE"
                 elif field_type == "esriFieldTypeDate":
                     arcpy_type = "DATE"
+                elif field_type in ["esriFieldTypeGUID", "esriFieldTypeGlobalID"]:
+                    arcpy_type = "GUID"
 
                 field_length = field.get("length", 255) if arcpy_type == "TEXT" else None
                 try:
                     arcpy.AddField_management(final_fc, field_name, arcpy_type, field_length=field_length)
+                    added_fields.append(field)
                 except Exception:
                     self._emit(f"Failed to add field: {field_name}", severity=1)
 
-        self._emit(f"Created empty featureclass: {final_fc}")
+        return added_fields
+
+    @staticmethod
+    def _spatial_reference_from_json(sr_info):
+        if not sr_info:
+            return None
+        wkid = sr_info.get("latestWkid") or sr_info.get("wkid")
+        if wkid:
+            return arcpy.SpatialReference(int(wkid))
+        if sr_info.get("wkt"):
+            spatial_ref = arcpy.SpatialReference()
+            spatial_ref.loadFromString(sr_info["wkt"])
+            return spatial_ref
+        return None
+
+    @staticmethod
+    def _merge_layer_fields(response, service_info):
+        """Fill in what PBF field definitions lack (length, domain, ...) from the layer's own fields, by name."""
+        layer_fields = {(f.get("name") or "").lower(): f for f in service_info.get("fields") or []}
+        response["fields"] = [
+            dict(layer_fields.get((f.get("name") or "").lower(), {}), **f) for f in response["fields"]
+        ]
+
+    def _open_stream_writer(self, final_fc, service_info, response, append=False):
+        """Open one insert cursor on final_fc.
+
+        final_fc is created from the first chunk response, or reopened as-is
+        when append is set (resuming a checkpointed download).
+        """
+        response = response or {}
+        field_list = response.get("fields") or service_info.get("fields") or []
+        if not self.preserve_global_ids:
+            field_list = [f for f in field_list if f.get("type") != "esriFieldTypeGlobalID"]
+
+        sr_info = response.get("spatialReference") or (service_info.get("extent") or {}).get("spatialReference")
+        if append:
+            existing_names = {f.name.lower() for f in arcpy.ListFields(final_fc)}
+            added_fields = [
+                f
+                for f in field_list
+                if f.get("type") not in ["esriFieldTypeOID", "esriFieldTypeGeometry"]
+                and (f.get("name") or "").lower() in existing_names
+            ]
+            self._emit(f"Reopened {final_fc}, streamin' the rest of the features in")
+        else:
+            if arcpy.Exists(final_fc):
+                arcpy.Delete_management(final_fc)
+            spatial_ref = self._spatial_reference_from_json(sr_info)
+            geometry_type = response.get("geometryType") or service_info.get("geometryType")
+            added_fields = self._create_schema(final_fc, field_list, geometry_type, spatial_ref)
+            self._emit(f"Created {final_fc}, streamin' features straight in")
+
+        field_names = [f.get("name") for f in added_fields]
+        date_fields = {f.get("name") for f in added_fields if f.get("type") == "esriFieldTypeDate"}
+        cursor = arcpy.da.InsertCursor(final_fc, ["SHAPE@"] + field_names)
+        return {"cursor": cursor, "field_names": field_names, "date_fields": date_fields, "sr_info": sr_info}
+
+    @staticmethod
+    def _esri_date_to_datetime(value):
+        if value is None:
+            return None
+        return datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=value)
+
+    def _write_stream_features(self, stream_writer, features):
+        cursor = stream_writer["cursor"]
+        field_names = stream_writer["field_names"]
+        date_fields = stream_writer["date_fields"]
+        sr_info = stream_writer["sr_info"]
+
+        for feature in features:
+            geometry = feature.get("geometry")
+            shape = None
+            if geometry:
+                if sr_info and "spatialReference" not in geometry:
+                    geometry = dict(geometry, spatialReference=sr_info)
+                shape = arcpy.AsShape(geometry, True)
+
+            attributes = feature.get("attributes") or {}
+            row = [shape]
+            for name in field_names:
+                value = attributes.get(name)
+                if name in date_fields:
+                    value = self._esri_date_to_datetime(value)
+                row.append(value)
+            cursor.insertRow(row)
 
     def run(self):
         start_time = datetime.datetime.today()
@@ -714,6 +2687,7 @@ class DataPillagerRunner:
 
         self._emit(f"DataPillager core version: {CORE_VERSION}")
         self._emit(f"DataPillager core module: {__file__}")
+        self._emit(f"JSON codec: {self.json_backend}")
 
         if not self.service_endpoint:
             raise DataPillagerError("Service endpoint is required")
@@ -743,15 +2717,48 @@ class DataPillagerRunner:
                     token_client_type = "referer"
 
             self.session = self.create_session()
+            self._pool_warnings = PoolWarningHandler(self._emit)
+            logging.getLogger("urllib3.connectionpool").addHandler(self._pool_warnings)
+            if self.pool_maxsize < self.max_inflight_requests and not self.pool_block:
+                self._emit(
+                    f"Pool max size {self.pool_maxsize} is below {self.max_inflight_requests} in-flight requests, "
+                    "expect connections to be discarded",
+                    severity=1,
+                )
+            if self.async_transport:
+                if datapillager_async.AVAILABLE:
+                    self.async_engine = datapillager_async.AsyncHttpEngine(
+                        max_concurrency=self.max_inflight_requests,
+                        max_tries=self.max_tries,
+                        sleep_time=self.sleep_time,
+                        connect_timeout=self.connect_timeout,
+                        read_timeout=self.read_timeout,
+                        verify=self.session.verify,
+                        # aiohttp sets Accept-Encoding for the codecs it can decode itself.
+                        headers={k: v for k, v in self.session.headers.items() if k.lower() != "accept-encoding"},
+                        rate_limiter=self.rate_limiter,
+                    ).start()
+                    self._emit(f"Async transport up, {self.max_inflight_requests} requests allowed in flight")
+                else:
+                    self._emit("Async transport needs the aiohttp package, stickin' with requests", severity=1)
+            if self.metadata_cache_path:
+                self.metadata_cache = MetadataCache(
+                    self.metadata_cache_path,
+                    self.metadata_cache_ttl_minutes,
+                    identity=self.username or self.existing_token,
+                )
 
             if self.username and not self.existing_token:
-                token = self.get_token(
-                    referer=self.referring_domain,
-                    adapter_name=adapter_name,
-                    client_type=token_client_type,
-                )
+                referer = self.referring_domain
+
+                def _generate():
+                    return self._generate_token(referer=referer, adapter_name=adapter_name, client_type=token_client_type)
+
+                self.token_manager = TokenManager(*_generate(), generate=_generate)
+                token = self.token_manager.token
             elif self.existing_token:
                 token = self.existing_token
+                self.token_manager = TokenManager(token)
 
             if self.include_attachments:
                 self._emit(
@@ -765,19 +2772,44 @@ class DataPillagerRunner:
             self._emit(f"Blimey, {len(service_layers_to_get)} layers for the pillagin'")
 
             slyr_tracker = {}
-            for slyr in service_layers_to_get:
-                slyr_tracker[slyr] = self.pillage_the_layer(slyr, token, output_folder, self.output_workspace)
+            if self.max_concurrent_layers > 1 and len(service_layers_to_get) > 1:
+                slyr_tracker = self.pillage_the_layers(service_layers_to_get, token, output_folder, self.output_workspace)
+            else:
+                for slyr in service_layers_to_get:
+                    slyr_tracker[slyr] = self.pillage_the_layer(slyr, token, output_folder, self.output_workspace)
 
             for slyr, result in slyr_tracker.items():
                 self._emit(f"{slyr} plunder result: {result}")
 
+            if self.metadata_cache is not None:
+                cache = self.metadata_cache
+                self._emit(
+                    f"Metadata cache: {cache.hits} fresh, {cache.revalidated} revalidated, {cache.misses} fetched"
+                )
+
+            if self.token_manager is not None and self.token_manager.refreshes:
+                self._emit(f"Token refreshed {self.token_manager.refreshes} times during the run")
+
+            for host, throttles in sorted(self.rate_limiter.throttles.items()):
+                self._emit(f"{host} throttled {throttles} requests", severity=1)
+
+            if self._pool_warnings is not None and self._pool_warnings.discards:
+                for host, discards in sorted(self._pool_warnings.discards.items()):
+                    self._emit(f"Connection pool to {host} overflowed {discards} times", severity=1)
+
             completed = True
             return slyr_tracker
         finally:
+            if self._pool_warnings is not None:
+                logging.getLogger("urllib3.connectionpool").removeHandler(self._pool_warnings)
             if self.user_overwrite_setting is not None:
                 arcpy.env.overwriteOutput = self.user_overwrite_setting
             if hasattr(arcpy.env, "preserveGlobalIds") and self.user_preserve_globalids_setting is not None:
                 arcpy.env.preserveGlobalIds = self.user_preserve_globalids_setting
+            if self.async_engine is not None:
+                self.async_engine.close()
+                self.async_engine = None
+            self._close_conversion_pool()
             if self.session is not None:
                 self.session.close()
             if completed:
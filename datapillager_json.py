@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""JSON codec used for DataPillager's bulk JSON work.
+
+orjson is used when it is installed and the standard library json module
+otherwise. Input orjson won't parse (NaN/Infinity literals, integers past
+64 bits) and objects it won't serialize (integers past 64 bits, non-string
+keys) fall back to the standard library. The one difference in output is
+non-finite floats: orjson writes NaN and Infinity as null, the standard
+library as the NaN/Infinity literals. Call use_backend("json") to force the
+standard library.
+
+The backend is process-wide: use_backend changes it for every runner and
+stream writer in the process.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ("orjson", "json") if orjson is not None else ("json",)
+backend = BACKENDS[0]
+
+
+def use_backend(name):
+    """Select "orjson", "json" or "auto" for the whole process; returns the backend now in use."""
+    global backend
+    name = (name or "auto").strip().lower()
+    if name == "auto":
+        backend = BACKENDS[0]
+    elif name in BACKENDS:
+        backend = name
+    else:
+        raise ValueError(f"JSON backend {name!r} is not available, choose from {', '.join(BACKENDS)}")
+    return backend
+
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    if backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Serialize obj to a compact str, leaving non-ASCII characters as is."""
+    return dump_bytes(obj).decode("utf-8")
+
+
+def dump_bytes(obj):
+    """Serialize obj to compact UTF-8 encoded bytes.
+
+    Non-finite floats come out as null from orjson and as NaN/Infinity from the standard library.
+    """
+    if backend == "orjson":
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
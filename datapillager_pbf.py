@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""Decoder for ArcGIS feature query responses requested with f=pbf.
+
+Hosted feature services can return query results as an Esri
+FeatureCollectionPBuffer protocol buffer. This module reads that wire format
+directly (no protobuf dependency) and returns the same dictionary shape as the
+f=json response, so the rest of the pipeline does not need to know which
+format was used.
+"""
+
+import struct
+
+_GEOMETRY_TYPES = {
+    0: "esriGeometryPoint",
+    1: "esriGeometryMultipoint",
+    2: "esriGeometryPolyline",
+    3: "esriGeometryPolygon",
+    4: "esriGeometryMultiPatch",
+}
+
+_FIELD_TYPES = [
+    "esriFieldTypeSmallInteger",
+    "esriFieldTypeInteger",
+    "esriFieldTypeSingle",
+    "esriFieldTypeDouble",
+    "esriFieldTypeString",
+    "esriFieldTypeDate",
+    "esriFieldTypeOID",
+    "esriFieldTypeGeometry",
+    "esriFieldTypeBlob",
+    "esriFieldTypeRaster",
+    "esriFieldTypeGUID",
+    "esriFieldTypeGlobalID",
+    "esriFieldTypeXML",
+]
+
+_UPPER_LEFT = 0
+
+
+class PbfDecodeError(ValueError):
+    """Raised when a response body is not a valid feature collection buffer."""
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise PbfDecodeError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _signed64(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _iter_fields(data):
+    """Yield (field number, wire type, value) for each field in a message.
+
+    Length-delimited values are returned as memoryview slices; fixed-width
+    values as raw bytes.
+    """
+    view = memoryview(data)
+    pos = 0
+    end = len(view)
+    while pos < end:
+        key, pos = _read_varint(view, pos)
+        field_number = key >> 3
+        wire_type = key & 0x07
+        if wire_type == 0:
+            value, pos = _read_varint(view, pos)
+        elif wire_type == 1:
+            value = view[pos : pos + 8]
+            pos += 8
+        elif wire_type == 2:
+            length, pos = _read_varint(view, pos)
+            value = view[pos : pos + length]
+            pos += length
+        elif wire_type == 5:
+            value = view[pos : pos + 4]
+            pos += 4
+        else:
+            raise PbfDecodeError(f"Unsupported wire type {wire_type}")
+        if pos > end:
+            raise PbfDecodeError("Truncated message")
+        yield field_number, wire_type, value
+
+
+def _packed_varints(wire_type, value):
+    if wire_type == 0:
+        return [value]
+    values = []
+    pos = 0
+    while pos < len(value):
+        item, pos = _read_varint(value, pos)
+        values.append(item)
+    return values
+
+
+def _decode_string(value):
+    return bytes(value).decode("utf-8")
+
+
+def _decode_value(data):
+    for field_number, _, value in _iter_fields(data):
+        if field_number == 1:
+            return _decode_string(value)
+        if field_number == 2:
+            return struct.unpack("<f", value)[0]
+        if field_number == 3:
+            return struct.unpack("<d", value)[0]
+        if field_number in (4, 8):
+            return _zigzag(value)
+        if field_number in (5, 7):
+            return value
+        if field_number == 6:
+            return _signed64(value)
+        if field_number == 9:
+            return bool(value)
+    return None
+
+
+def _decode_spatial_reference(data):
+    spatial_reference = {}
+    for field_number, _, value in _iter_fields(data):
+        if field_number == 1:
+            spatial_reference["wkid"] = value
+        elif field_number == 2:
+            spatial_reference["latestWkid"] = value
+        elif field_number == 3:
+            spatial_reference["vcsWkid"] = value
+        elif field_number == 4:
+            spatial_reference["latestVcsWkid"] = value
+        elif field_number == 5:
+            spatial_reference["wkt"] = _decode_string(value)
+    return spatial_reference
+
+
+def _decode_doubles(data):
+    values = {}
+    for field_number, _, value in _iter_fields(data):
+        values[field_number] = struct.unpack("<d", value)[0]
+    return values
+
+
+def _decode_transform(data):
+    transform = {"origin": _UPPER_LEFT, "scale": {}, "translate": {}}
+    for field_number, _, value in _iter_fields(data):
+        if field_number == 1:
+            transform["origin"] = value
+        elif field_number == 2:
+            transform["scale"] = _decode_doubles(value)
+        elif field_number == 3:
+            transform["translate"] = _decode_doubles(value)
+    return transform
+
+
+def _decode_field(data):
+    field = {}
+    for field_number, _, value in _iter_fields(data):
+        if field_number == 1:
+            field["name"] = _decode_string(value)
+        elif field_number == 2:
+            field["type"] = _FIELD_TYPES[value] if value < len(_FIELD_TYPES) else "esriFieldTypeString"
+        elif field_number == 3:
+            field["alias"] = _decode_string(value)
+    return field
+
+
+def _decode_geometry(data, geometry_type, transform, has_z, has_m):
+    lengths = []
+    coords = []
+    for field_number, wire_type, value in _iter_fields(data):
+        if field_number == 2:
+            lengths.extend(_packed_varints(wire_type, value))
+        elif field_number == 3:
+            coords.extend(_zigzag(item) for item in _packed_varints(wire_type, value))
+
+    if not coords:
+        return None
+
+    dims = 2 + bool(has_z) + bool(has_m)
+    scale = transform["scale"]
+    translate = transform["translate"]
+    x_scale, y_scale = scale.get(1, 1.0), scale.get(2, 1.0)
+    m_scale, z_scale = scale.get(3, 1.0), scale.get(4, 1.0)
+    x_translate, y_translate = translate.get(1, 0.0), translate.get(2, 0.0)
+    m_translate, z_translate = translate.get(3, 0.0), translate.get(4, 0.0)
+    y_sign = -1.0 if transform["origin"] == _UPPER_LEFT else 1.0
+
+    # Quantized coordinates are delta encoded across every part of the geometry.
+    points = []
+    running = [0] * dims
+    for idx in range(0, len(coords), dims):
+        for dim in range(dims):
+            running[dim] += coords[idx + dim]
+        point = [running[0] * x_scale + x_translate, y_translate + y_sign * running[1] * y_scale]
+        if has_z:
+            point.append(running[2] * z_scale + z_translate)
+        if has_m:
+            point.append(running[dims - 1] * m_scale + m_translate)
+        points.append(point)
+
+    if geometry_type == "esriGeometryPoint":
+        geometry = {"x": points[0][0], "y": points[0][1]}
+        if has_z:
+            geometry["z"] = points[0][2]
+        if has_m:
+            geometry["m"] = points[0][-1]
+        return geometry
+
+    if geometry_type == "esriGeometryMultipoint":
+        return {"points": points}
+
+    parts = []
+    start = 0
+    for length in lengths or [len(points)]:
+        parts.append(points[start : start + length])
+        start += length
+    key = "rings" if geometry_type == "esriGeometryPolygon" else "paths"
+    return {key: parts}
+
+
+def _decode_feature(data, field_names, geometry_type, transform, has_z, has_m):
+    values = []
+    geometry = None
+    for field_number, _, value in _iter_fields(data):
+        if field_number == 1:
+            values.append(_decode_value(value))
+        elif field_number == 2:
+            geometry = _decode_geometry(value, geometry_type, transform, has_z, has_m)
+
+    feature = {"attributes": dict(zip(field_names, values))}
+    if geometry is not None:
+        feature["geometry"] = geometry
+    return feature
+
+
+def _decode_feature_result(data):
+    result = {"fields": [], "features": []}
+    transform = {"origin": _UPPER_LEFT, "scale": {}, "translate": {}}
+    geometry_type_code = None
+    has_z = False
+    has_m = False
+    raw_features = []
+
+    for field_number, _, value in _iter_fields(data):
+        if field_number == 1:
+            result["objectIdFieldName"] = _decode_string(value)
+        elif field_number == 3:
+            result["globalIdFieldName"] = _decode_string(value)
+        elif field_number == 7:
+            geometry_type_code = value
+        elif field_number == 8:
+            result["spatialReference"] = _decode_spatial_reference(value)
+        elif field_number == 9:
+            result["exceededTransferLimit"] = bool(value)
+        elif field_number == 10:
+            has_z = bool(value)
+        elif field_number == 11:
+            has_m = bool(value)
+        elif field_number == 12:
+            transform = _decode_transform(value)
+        elif field_number == 13:
+            result["fields"].append(_decode_field(value))
+        elif field_number == 15:
+            # Features can precede the transform on the wire, so decode them last.
+            raw_features.append(value)
+
+    geometry_type = _GEOMETRY_TYPES.get(geometry_type_code)
+    if geometry_type:
+        result["geometryType"] = geometry_type
+    result["hasZ"] = has_z
+    result["hasM"] = has_m
+
+    field_names = [field.get("name") for field in result["fields"]]
+    result["features"] = [
+        _decode_feature(raw, field_names, geometry_type, transform, has_z, has_m) for raw in raw_features
+    ]
+    return result
+
+
+def decode_feature_collection(data):
+    """Decode a FeatureCollectionPBuffer body into an Esri JSON style dict.
+
+    Feature results become {"fields", "features", "geometryType",
+    "spatialReference", ...}; count and ID-only results become {"count": n}
+    and {"objectIds": [...]}.
+    """
+    for field_number, _, query_result in _iter_fields(data):
+        if field_number != 2:
+            continue
+        for result_number, _, value in _iter_fields(query_result):
+            if result_number == 1:
+                return _decode_feature_result(value)
+            if result_number == 2:
+                for count_number, _, count in _iter_fields(value):
+                    if count_number == 1:
+                        return {"count": count}
+                return {"count": 0}
+            if result_number == 3:
+                ids_result = {"objectIds": []}
+                for ids_number, ids_wire_type, ids_value in _iter_fields(value):
+                    if ids_number == 1:
+                        ids_result["objectIdFieldName"] = _decode_string(ids_value)
+                    elif ids_number == 3:
+                        ids_result["objectIds"].extend(_packed_varints(ids_wire_type, ids_value))
+                return ids_result
+    raise PbfDecodeError("No query result found in PBF response")
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Per-host rate limiting and the shared in-flight request cap.
+
+HostRateLimiter keeps a token bucket per host and backs a host off when it
+throttles (429, or 503 with Retry-After). RequestSlots caps requests in flight
+across every worker thread, and lets a thread hand its slot back while it
+waits on the limiter. Both are plain Python so the runner's requests adapter
+and the async transport can share them.
+"""
+
+import collections
+import datetime
+import email.utils
+import threading
+import time
+import urllib.parse
+
+
+class HostRateLimiter:
+    """Token bucket per host, slowed down whenever the server throttles.
+
+    requests_per_second caps each host (0 leaves hosts uncapped until they
+    push back). A throttled host pauses for its Retry-After (or one token
+    interval) and has its rate halved, down to min_rate; after a run of
+    successes the rate creeps back up toward the configured cap. clock
+    (time.monotonic by default) is the time source.
+    """
+
+    min_rate = 0.2
+    recovery_streak = 20
+
+    def __init__(self, requests_per_second=0, emit=None, clock=time.monotonic):
+        self.rate = float(requests_per_second or 0)
+        self._emit = emit
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self.throttles = collections.Counter()
+
+    @staticmethod
+    def _host(url):
+        return urllib.parse.urlsplit(url).netloc.lower()
+
+    def _state(self, host, now):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                "rate": self.rate,
+                "tokens": max(1.0, self.rate),
+                "updated": now,
+                "blocked_until": 0.0,
+                "streak": 0,
+                "last_request": None,
+                "interval": None,
+            }
+        return state
+
+    def reserve(self, url):
+        """Take a token for url's host and return how many seconds to wait before sending."""
+        host = self._host(url)
+        with self._lock:
+            now = self._clock()
+            state = self._state(host, now)
+            if state["last_request"] is not None:
+                gap = now - state["last_request"]
+                state["interval"] = gap if state["interval"] is None else 0.8 * state["interval"] + 0.2 * gap
+            state["last_request"] = now
+
+            delay = max(0.0, state["blocked_until"] - now)
+            rate = state["rate"]
+            if rate > 0:
+                burst = max(1.0, rate)
+                state["tokens"] = min(burst, state["tokens"] + (now - state["updated"]) * rate) - 1
+                state["updated"] = now
+                if state["tokens"] < 0:
+                    delay = max(delay, -state["tokens"] / rate)
+            return delay
+
+    def acquire(self, url, sleep=time.sleep):
+        delay = self.reserve(url)
+        if delay > 0:
+            sleep(delay)
+
+    def throttled(self, url, retry_after=None):
+        """Record a 429 (or 503 with Retry-After) from url's host and slow that host down."""
+        host = self._host(url)
+        wait = self.parse_retry_after(retry_after)
+        with self._lock:
+            now = self._clock()
+            state = self._state(host, now)
+            current = state["rate"]
+            if current <= 0 and state["interval"]:
+                current = 1.0 / state["interval"]
+            state["rate"] = max(self.min_rate, current / 2 if current > 0 else 1.0)
+            state["tokens"] = min(state["tokens"], 0.0)
+            state["updated"] = now
+            state["streak"] = 0
+            state["blocked_until"] = max(state["blocked_until"], now + (wait if wait is not None else 1.0 / state["rate"]))
+            self.throttles[host] += 1
+            first = self.throttles[host] == 1
+            new_rate = state["rate"]
+        if first and self._emit:
+            self._emit(f"{host} be throttlin' us, slowin' to {new_rate:.1f} requests per second", severity=1)
+
+    def succeeded(self, url):
+        host = self._host(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state["rate"] <= 0 or (self.rate > 0 and state["rate"] >= self.rate):
+                return
+            state["streak"] += 1
+            if state["streak"] >= self.recovery_streak:
+                state["streak"] = 0
+                state["rate"] *= 1.25
+                if self.rate > 0:
+                    state["rate"] = min(self.rate, state["rate"])
+                elif state["interval"] and state["rate"] > 2.0 / state["interval"]:
+                    # Well clear of the pace we actually send at: uncap the host again.
+                    state["rate"] = 0.0
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=datetime.timezone.utc)
+        return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class RequestSlots:
+    """Bounded semaphore capping in-flight HTTP requests, whose holders can give their slot up while they wait.
+
+    Rate limit waits go through sleep(), which releases the calling thread's
+    slot for the duration, so a throttled host doesn't tie up slots that
+    requests to other hosts could be using.
+    """
+
+    def __init__(self, count, sleep=time.sleep):
+        self._semaphore = threading.BoundedSemaphore(count)
+        self._held = threading.local()
+        self._sleep = sleep
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        self._held.count = getattr(self._held, "count", 0) + 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._held.count -= 1
+        self._semaphore.release()
+
+    def sleep(self, seconds):
+        held = getattr(self._held, "count", 0)
+        for _ in range(held):
+            self._semaphore.release()
+        try:
+            self._sleep(seconds)
+        finally:
+            for _ in range(held):
+                self._semaphore.acquire()
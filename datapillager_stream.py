@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Incremental parsing of Esri JSON feature query responses.
+
+A chunk response parsed with response.json() and then written back out with
+json.dumps is held in memory three times over: raw body, parsed dict and
+string copy. iter_feature_collection instead walks the top-level object as
+blocks arrive from the socket and hands back one feature at a time, and
+FeatureFileWriter writes them straight into an Esri JSON file that
+JSONToFeatures can read. Only the current block and the current feature are
+held in memory.
+"""
+
+import codecs
+import json
+import re
+
+import datapillager_json
+
+# Yielded as the key for each element of the "features" array.
+FEATURE = object()
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# What can follow a number's digits when the rest of it is still in the next block ("1." + "5", "2e" + "-3").
+_NUMBER_TAIL = re.compile(r"[.eE+\-]*\Z")
+
+
+class StreamParseError(ValueError):
+    """Raised when the response body is not a complete JSON object."""
+
+
+class _TextBuffer:
+    """UTF-8 text decoded incrementally from an iterable of byte blocks."""
+
+    def __init__(self, blocks):
+        self._blocks = iter(blocks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        if self.eof:
+            return False
+        # Drop what has been consumed so the buffer never grows past one block plus one value.
+        self.text = self.text[self.pos :]
+        self.pos = 0
+        block = next(self._blocks, None)
+        try:
+            if block is None:
+                self.eof = True
+                self.text += self._decoder.decode(b"", final=True)
+            else:
+                self.text += self._decoder.decode(block)
+        except UnicodeDecodeError as ex:
+            raise StreamParseError(f"Response is not valid UTF-8: {ex}") from ex
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self._more():
+                raise StreamParseError("Response ended mid-document")
+
+    def take(self, expected):
+        char = self.peek()
+        if char not in expected:
+            raise StreamParseError(f"Expected one of {expected!r} at offset {self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.text, self.pos)
+            except ValueError as ex:
+                # Usually the value is just cut off at the end of the block; read on and try again.
+                if not self._more():
+                    raise StreamParseError(str(ex)) from ex
+                continue
+            if not self.eof and (
+                end == len(self.text) or (isinstance(value, (int, float)) and _NUMBER_TAIL.match(self.text, end))
+            ):
+                # A number at the very end of the buffer may carry on in the next block.
+                self._more()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_feature_collection(blocks):
+    """Parse a JSON object from an iterable of byte blocks, streaming its features.
+
+    Yields (FEATURE, feature) for each element of the top-level "features"
+    array and (key, value) for every other top-level key (fields,
+    spatialReference, exceededTransferLimit, error, ...), in document order.
+    """
+    buffer = _TextBuffer(blocks)
+    buffer.take("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        key = buffer.value()
+        buffer.take(":")
+        if key == "features" and buffer.peek() == "[":
+            buffer.take("[")
+            if buffer.peek() == "]":
+                buffer.take("]")
+            else:
+                while True:
+                    yield FEATURE, buffer.value()
+                    if buffer.take(",]") == "]":
+                        break
+        else:
+            yield key, buffer.value()
+        if buffer.take(",}") == "}":
+            return
+
+
+class FeatureFileWriter:
+    """Write an Esri JSON feature set one key or feature at a time.
+
+    Keys seen after the features array (such as exceededTransferLimit) are
+    written after it, which JSONToFeatures accepts.
+    """
+
+    def __init__(self, handle):
+        self._handle = handle
+        self._keys = 0
+        self._features_state = None
+        self.count = 0
+        handle.write("{")
+
+    def _next_key(self, key):
+        if self._keys:
+            self._handle.write(",")
+        self._keys += 1
+        self._handle.write(datapillager_json.dumps(key))
+        self._handle.write(":")
+
+    def _close_features(self):
+        if self._features_state == "open":
+            self._handle.write("]")
+            self._features_state = "closed"
+
+    def header(self, key, value):
+        self._close_features()
+        self._next_key(key)
+        self._handle.write(datapillager_json.dumps(value))
+
+    def feature(self, feature):
+        if self._features_state is None:
+            self._next_key("features")
+            self._handle.write("[")
+            self._features_state = "open"
+        elif self._features_state == "closed":
+            raise StreamParseError("Response has more than one features array")
+        elif self.count:
+            self._handle.write(",")
+        self._handle.write(datapillager_json.dumps(feature))
+        self.count += 1
+
+    def close(self):
+        if self._features_state is None:
+            self._next_key("features")
+            self._handle.write("[")
+            self._features_state = "open"
+        self._close_features()
+        self._handle.write("}")
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""Tests for the FeatureCollectionPBuffer decoder, using hand-built buffers.
+
+    python -m pytest tests
+"""
+
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datapillager_pbf  # noqa: E402
+from datapillager_pbf import PbfDecodeError, decode_feature_collection  # noqa: E402
+
+
+def varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def field_varint(number, value):
+    return varint(number << 3) + varint(value)
+
+
+def field_bytes(number, payload):
+    return varint(number << 3 | 2) + varint(len(payload)) + payload
+
+
+def field_double(number, value):
+    return varint(number << 3 | 1) + struct.pack("<d", value)
+
+
+def field_float(number, value):
+    return varint(number << 3 | 5) + struct.pack("<f", value)
+
+
+def packed(number, values):
+    return field_bytes(number, b"".join(varint(value) for value in values))
+
+
+def transform(origin, scale, translate):
+    return (
+        field_varint(1, origin)
+        + field_bytes(2, field_double(1, scale[0]) + field_double(2, scale[1]))
+        + field_bytes(3, field_double(1, translate[0]) + field_double(2, translate[1]))
+    )
+
+
+def collection(feature_result):
+    return field_bytes(2, field_bytes(1, feature_result))
+
+
+class VarintTests(unittest.TestCase):
+    def test_read_varint(self):
+        for value in (0, 1, 127, 128, 300, 2**32, 2**63):
+            self.assertEqual(datapillager_pbf._read_varint(varint(value), 0), (value, len(varint(value))))
+
+    def test_read_varint_at_offset(self):
+        data = b"\x00" + varint(300)
+        self.assertEqual(datapillager_pbf._read_varint(data, 1), (300, 3))
+
+    def test_truncated_varint(self):
+        with self.assertRaises(PbfDecodeError):
+            datapillager_pbf._read_varint(b"\xac", 0)
+
+    def test_zigzag(self):
+        for encoded, decoded in ((0, 0), (1, -1), (2, 1), (3, -2), (4294967294, 2147483647), (4294967295, -2147483648)):
+            self.assertEqual(datapillager_pbf._zigzag(encoded), decoded)
+
+    def test_signed64(self):
+        self.assertEqual(datapillager_pbf._signed64(5), 5)
+        self.assertEqual(datapillager_pbf._signed64(2**64 - 1), -1)
+        self.assertEqual(datapillager_pbf._signed64(2**63), -(2**63))
+
+    def test_packed_varints(self):
+        self.assertEqual(datapillager_pbf._packed_varints(0, 7), [7])
+        self.assertEqual(datapillager_pbf._packed_varints(2, varint(1) + varint(300) + varint(2)), [1, 300, 2])
+
+    def test_unsupported_wire_type(self):
+        with self.assertRaises(PbfDecodeError):
+            list(datapillager_pbf._iter_fields(varint(1 << 3 | 3)))
+
+    def test_truncated_message(self):
+        with self.assertRaises(PbfDecodeError):
+            list(datapillager_pbf._iter_fields(varint(1 << 3 | 2) + varint(10) + b"abc"))
+
+
+class ValueTests(unittest.TestCase):
+    def decode(self, payload):
+        return datapillager_pbf._decode_value(payload)
+
+    def test_string(self):
+        self.assertEqual(self.decode(field_bytes(1, "Ōtautahi".encode("utf-8"))), "Ōtautahi")
+
+    def test_float(self):
+        self.assertAlmostEqual(self.decode(field_float(2, 1.5)), 1.5)
+
+    def test_double(self):
+        self.assertEqual(self.decode(field_double(3, 12345.678)), 12345.678)
+
+    def test_sint32(self):
+        self.assertEqual(self.decode(field_varint(4, zigzag(-42))), -42)
+
+    def test_uint32(self):
+        self.assertEqual(self.decode(field_varint(5, 4000000000)), 4000000000)
+
+    def test_int64(self):
+        self.assertEqual(self.decode(field_varint(6, 2**64 - 7)), -7)
+
+    def test_uint64(self):
+        self.assertEqual(self.decode(field_varint(7, 2**63 + 1)), 2**63 + 1)
+
+    def test_sint64(self):
+        self.assertEqual(self.decode(field_varint(8, zigzag(-(2**40)))), -(2**40))
+
+    def test_bool(self):
+        self.assertIs(self.decode(field_varint(9, 1)), True)
+        self.assertIs(self.decode(field_varint(9, 0)), False)
+
+    def test_null(self):
+        self.assertIsNone(self.decode(b""))
+
+
+class GeometryTests(unittest.TestCase):
+    identity = {"origin": 1, "scale": {}, "translate": {}}
+
+    def geometry(self, lengths, coords):
+        payload = b""
+        if lengths:
+            payload += packed(2, lengths)
+        return payload + packed(3, [zigzag(value) for value in coords])
+
+    def test_delta_decoding_runs_across_parts(self):
+        data = self.geometry([2, 2], [0, 0, 10, 0, 0, 5, -10, 0])
+        geometry = datapillager_pbf._decode_geometry(data, "esriGeometryPolyline", self.identity, False, False)
+        self.assertEqual(geometry, {"paths": [[[0.0, 0.0], [10.0, 0.0]], [[10.0, 5.0], [0.0, 5.0]]]})
+
+    def test_polygon_rings(self):
+        data = self.geometry([4], [0, 0, 1, 0, 0, 1, -1, -1])
+        geometry = datapillager_pbf._decode_geometry(data, "esriGeometryPolygon", self.identity, False, False)
+        self.assertEqual(geometry, {"rings": [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]})
+
+    def test_multipoint(self):
+        data = self.geometry([], [3, 4, 1, 1])
+        geometry = datapillager_pbf._decode_geometry(data, "esriGeometryMultipoint", self.identity, False, False)
+        self.assertEqual(geometry, {"points": [[3.0, 4.0], [4.0, 5.0]]})
+
+    def test_point_with_z_and_m(self):
+        data = self.geometry([], [3, 4, 5, 6])
+        geometry = datapillager_pbf._decode_geometry(data, "esriGeometryPoint", self.identity, True, True)
+        self.assertEqual(geometry, {"x": 3.0, "y": 4.0, "z": 5.0, "m": 6.0})
+
+    def test_no_coordinates(self):
+        self.assertIsNone(datapillager_pbf._decode_geometry(b"", "esriGeometryPoint", self.identity, False, False))
+
+
+class TransformTests(unittest.TestCase):
+    def test_decode_transform(self):
+        decoded = datapillager_pbf._decode_transform(transform(1, (0.5, 0.25), (100.0, 200.0)))
+        self.assertEqual(decoded, {"origin": 1, "scale": {1: 0.5, 2: 0.25}, "translate": {1: 100.0, 2: 200.0}})
+
+    def test_upper_left_origin_flips_y(self):
+        quantization = datapillager_pbf._decode_transform(transform(0, (0.5, 0.5), (100.0, 200.0)))
+        data = packed(3, [zigzag(4), zigzag(10)])
+        geometry = datapillager_pbf._decode_geometry(data, "esriGeometryPoint", quantization, False, False)
+        self.assertEqual(geometry, {"x": 102.0, "y": 195.0})
+
+    def test_lower_left_origin(self):
+        quantization = datapillager_pbf._decode_transform(transform(1, (0.5, 0.5), (100.0, 200.0)))
+        data = packed(3, [zigzag(4), zigzag(10)])
+        geometry = datapillager_pbf._decode_geometry(data, "esriGeometryPoint", quantization, False, False)
+        self.assertEqual(geometry, {"x": 102.0, "y": 205.0})
+
+
+class FeatureCollectionTests(unittest.TestCase):
+    def test_feature_result(self):
+        fields = field_bytes(13, field_bytes(1, b"OBJECTID") + field_varint(2, 6) + field_bytes(3, b"Object ID"))
+        fields += field_bytes(13, field_bytes(1, b"NAME") + field_varint(2, 4))
+        feature = field_bytes(1, field_varint(5, 7)) + field_bytes(1, field_bytes(1, b"Wharf"))
+        feature += field_bytes(2, packed(3, [zigzag(4), zigzag(10)]))
+        result = (
+            field_bytes(1, b"OBJECTID")
+            + field_varint(7, 0)
+            + field_bytes(8, field_varint(1, 102100) + field_varint(2, 3857))
+            + field_varint(9, 1)
+            # The feature comes before the transform, as some servers send it.
+            + field_bytes(15, feature)
+            + field_bytes(12, transform(0, (0.5, 0.5), (100.0, 200.0)))
+            + fields
+        )
+        decoded = decode_feature_collection(collection(result))
+        self.assertEqual(decoded["objectIdFieldName"], "OBJECTID")
+        self.assertEqual(decoded["geometryType"], "esriGeometryPoint")
+        self.assertEqual(decoded["spatialReference"], {"wkid": 102100, "latestWkid": 3857})
+        self.assertIs(decoded["exceededTransferLimit"], True)
+        self.assertEqual(
+            decoded["fields"],
+            [
+                {"name": "OBJECTID", "type": "esriFieldTypeOID", "alias": "Object ID"},
+                {"name": "NAME", "type": "esriFieldTypeString"},
+            ],
+        )
+        self.assertEqual(
+            decoded["features"],
+            [{"attributes": {"OBJECTID": 7, "NAME": "Wharf"}, "geometry": {"x": 102.0, "y": 195.0}}],
+        )
+
+    def test_count_result(self):
+        data = field_bytes(2, field_bytes(2, field_varint(1, 1234)))
+        self.assertEqual(decode_feature_collection(data), {"count": 1234})
+
+    def test_object_ids_result(self):
+        data = field_bytes(2, field_bytes(3, field_bytes(1, b"OBJECTID") + packed(3, [1, 2, 300])))
+        self.assertEqual(decode_feature_collection(data), {"objectIdFieldName": "OBJECTID", "objectIds": [1, 2, 300]})
+
+    def test_no_query_result(self):
+        with self.assertRaises(PbfDecodeError):
+            decode_feature_collection(field_varint(1, 1))
+
+    def test_truncated_body(self):
+        data = collection(field_bytes(1, b"OBJECTID"))
+        with self.assertRaises(PbfDecodeError):
+            decode_feature_collection(data[:-3])
+
+
+if __name__ == "__main__":
+    unittest.main()
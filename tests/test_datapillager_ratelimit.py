@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Tests for the per-host rate limiter and the shared request slots.
+
+    python -m pytest tests
+"""
+
+import datetime
+import email.utils
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datapillager_ratelimit import HostRateLimiter, RequestSlots  # noqa: E402
+
+URL = "https://services.example.com/arcgis/rest/services/Parcels/FeatureServer/0/query"
+OTHER_URL = "https://other.example.com/arcgis/rest/services/Roads/FeatureServer/0/query"
+HOST = "services.example.com"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReserveTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_uncapped_host_never_waits(self):
+        limiter = HostRateLimiter(0, clock=self.clock)
+        self.assertEqual([limiter.reserve(URL) for _ in range(50)], [0.0] * 50)
+
+    def test_burst_then_token_debt(self):
+        limiter = HostRateLimiter(2, clock=self.clock)
+        self.assertEqual([limiter.reserve(URL) for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+
+    def test_tokens_refill_with_time(self):
+        limiter = HostRateLimiter(2, clock=self.clock)
+        for _ in range(4):
+            limiter.reserve(URL)
+        self.clock.now += 1.0
+        self.assertEqual(limiter.reserve(URL), 0.5)
+
+    def test_refill_is_capped_at_one_second_of_burst(self):
+        limiter = HostRateLimiter(2, clock=self.clock)
+        limiter.reserve(URL)
+        self.clock.now += 60
+        self.assertEqual([limiter.reserve(URL) for _ in range(3)], [0.0, 0.0, 0.5])
+
+    def test_hosts_are_independent(self):
+        limiter = HostRateLimiter(1, clock=self.clock)
+        limiter.reserve(URL)
+        self.assertEqual(limiter.reserve(URL), 1.0)
+        self.assertEqual(limiter.reserve(OTHER_URL), 0.0)
+
+    def test_acquire_sleeps_for_the_delay(self):
+        limiter = HostRateLimiter(1, clock=self.clock)
+        slept = []
+        limiter.acquire(URL, sleep=slept.append)
+        limiter.acquire(URL, sleep=slept.append)
+        self.assertEqual(slept, [1.0])
+
+
+class ThrottleTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.messages = []
+        self.limiter = HostRateLimiter(4, emit=lambda msg, severity=0: self.messages.append(msg), clock=self.clock)
+
+    def rate(self):
+        return self.limiter._hosts[HOST]["rate"]
+
+    def test_throttle_halves_the_rate_down_to_the_minimum(self):
+        rates = []
+        for _ in range(6):
+            self.limiter.throttled(URL)
+            rates.append(self.rate())
+        self.assertEqual(rates, [2.0, 1.0, 0.5, 0.25, 0.2, 0.2])
+        self.assertEqual(self.limiter.throttles[HOST], 6)
+
+    def test_retry_after_blocks_the_host(self):
+        self.limiter.throttled(URL, "3")
+        self.assertEqual(self.limiter.reserve(URL), 3.0)
+        self.assertEqual(self.limiter.reserve(OTHER_URL), 0.0)
+
+    def test_throttle_without_retry_after_waits_one_token_interval(self):
+        self.limiter.throttled(URL)
+        self.assertEqual(self.limiter.reserve(URL), 0.5)
+
+    def test_first_throttle_per_host_is_reported_once(self):
+        self.limiter.throttled(URL)
+        self.limiter.throttled(URL)
+        self.limiter.throttled(OTHER_URL)
+        self.assertEqual(len(self.messages), 2)
+        self.assertIn(HOST, self.messages[0])
+
+    def test_uncapped_host_is_capped_below_its_observed_pace(self):
+        limiter = HostRateLimiter(0, clock=self.clock)
+        limiter.reserve(URL)
+        self.clock.now += 0.1
+        limiter.reserve(URL)
+        limiter.throttled(URL)
+        self.assertAlmostEqual(limiter._hosts[HOST]["rate"], 5.0)
+
+
+class RecoveryTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_success_streak_raises_the_rate_up_to_the_cap(self):
+        limiter = HostRateLimiter(4, clock=self.clock)
+        limiter.throttled(URL)
+        rates = []
+        for _ in range(5):
+            for _ in range(HostRateLimiter.recovery_streak):
+                limiter.succeeded(URL)
+            rates.append(limiter._hosts[HOST]["rate"])
+        self.assertEqual(rates, [2.5, 3.125, 3.90625, 4.0, 4.0])
+
+    def test_streak_is_reset_by_a_throttle(self):
+        limiter = HostRateLimiter(4, clock=self.clock)
+        limiter.throttled(URL)
+        for _ in range(HostRateLimiter.recovery_streak - 1):
+            limiter.succeeded(URL)
+        limiter.throttled(URL)
+        limiter.succeeded(URL)
+        self.assertEqual(limiter._hosts[HOST]["rate"], 1.0)
+
+    def test_success_on_an_unthrottled_host_is_a_no_op(self):
+        limiter = HostRateLimiter(4, clock=self.clock)
+        limiter.succeeded(URL)
+        self.assertNotIn(HOST, limiter._hosts)
+
+    def test_uncapped_host_is_uncapped_again_once_well_clear(self):
+        limiter = HostRateLimiter(0, clock=self.clock)
+        limiter.reserve(URL)
+        self.clock.now += 0.1
+        limiter.reserve(URL)
+        limiter.throttled(URL)
+        for _ in range(HostRateLimiter.recovery_streak * 10):
+            limiter.succeeded(URL)
+        self.assertEqual(limiter._hosts[HOST]["rate"], 0.0)
+        self.clock.now += 60
+        self.assertEqual([limiter.reserve(URL) for _ in range(10)], [0.0] * 10)
+
+
+class ParseRetryAfterTests(unittest.TestCase):
+    def test_missing(self):
+        self.assertIsNone(HostRateLimiter.parse_retry_after(None))
+        self.assertIsNone(HostRateLimiter.parse_retry_after(""))
+
+    def test_delta_seconds(self):
+        self.assertEqual(HostRateLimiter.parse_retry_after("5"), 5.0)
+        self.assertEqual(HostRateLimiter.parse_retry_after("1.5"), 1.5)
+        self.assertEqual(HostRateLimiter.parse_retry_after("-3"), 0.0)
+
+    def test_http_date(self):
+        when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=60)
+        wait = HostRateLimiter.parse_retry_after(email.utils.format_datetime(when, usegmt=True))
+        self.assertAlmostEqual(wait, 60, delta=2)
+
+    def test_http_date_in_the_past(self):
+        self.assertEqual(HostRateLimiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_garbage(self):
+        self.assertIsNone(HostRateLimiter.parse_retry_after("soon"))
+
+
+class RequestSlotsTests(unittest.TestCase):
+    @staticmethod
+    def try_take(slots, timeout=0.2):
+        """Whether another thread gets a slot within timeout; it gives it straight back."""
+        taken = threading.Event()
+
+        def _take():
+            with slots:
+                taken.set()
+
+        worker = threading.Thread(target=_take, daemon=True)
+        worker.start()
+        got_it = taken.wait(timeout)
+        return got_it, worker
+
+    def test_slot_is_released_while_sleeping(self):
+        seen = []
+        slots = RequestSlots(1, sleep=lambda seconds: seen.append(self.try_take(slots)[0]))
+        with slots:
+            slots.sleep(5)
+            self.assertEqual(seen, [True])
+            got_it, worker = self.try_take(slots, timeout=0.1)
+            self.assertFalse(got_it)
+        worker.join(1)
+        self.assertFalse(worker.is_alive())
+
+    def test_every_slot_held_by_the_thread_is_released(self):
+        seen = []
+        slots = RequestSlots(2, sleep=lambda seconds: seen.append(self.try_take(slots)[0]))
+        with slots:
+            with slots:
+                slots.sleep(1)
+        self.assertEqual(seen, [True])
+
+    def test_sleep_without_a_slot_just_sleeps(self):
+        slept = []
+        slots = RequestSlots(1, sleep=slept.append)
+        slots.sleep(2)
+        self.assertEqual(slept, [2])
+        with slots:
+            pass
+
+    def test_slot_is_taken_back_if_sleep_raises(self):
+        def _sleep(seconds):
+            raise KeyboardInterrupt
+
+        slots = RequestSlots(1, sleep=_sleep)
+        with self.assertRaises(KeyboardInterrupt):
+            with slots:
+                slots.sleep(1)
+        got_it, worker = self.try_take(slots)
+        self.assertTrue(got_it)
+        worker.join(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
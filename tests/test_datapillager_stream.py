@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Tests for the incremental feature collection parser and writer.
+
+Every document is fed in at every block size, so each value, number and
+multi-byte character gets split across a block boundary somewhere.
+
+    python -m pytest tests
+"""
+
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datapillager_stream import FEATURE, FeatureFileWriter, StreamParseError, iter_feature_collection  # noqa: E402
+
+DOCUMENT = {
+    "objectIdFieldName": "OBJECTID",
+    "geometryType": "esriGeometryPolygon",
+    "spatialReference": {"wkid": 2193, "latestWkid": 2193},
+    "fields": [{"name": "NAME", "type": "esriFieldTypeString", "alias": "Name", "length": 50}],
+    "features": [
+        {
+            "attributes": {"OBJECTID": 1234567, "NAME": "Ōtautahi / Christchurch", "AREA": -1.25e-7, "FLAG": None},
+            "geometry": {"rings": [[[1570000.125, 5180000.5], [1570010, 5180000], [1570000.125, 5180000.5]]]},
+        },
+        {"attributes": {"OBJECTID": 2, "NAME": "Te Whanganui-a-Tara ✓", "AREA": 0, "FLAG": True}},
+    ],
+    "exceededTransferLimit": False,
+}
+
+
+def blocks(data, size):
+    return [data[pos : pos + size] for pos in range(0, len(data), size)]
+
+
+def parse(data, size):
+    items = list(iter_feature_collection(blocks(data, size)))
+    features = [value for key, value in items if key is FEATURE]
+    header = [(key, value) for key, value in items if key is not FEATURE]
+    return features, header
+
+
+class IterFeatureCollectionTests(unittest.TestCase):
+    def assert_parses_at_every_block_size(self, document, data=None):
+        data = data if data is not None else json.dumps(document, ensure_ascii=False).encode("utf-8")
+        expected_header = [(key, value) for key, value in document.items() if key != "features"]
+        for size in range(1, len(data) + 1):
+            with self.subTest(block_size=size):
+                features, header = parse(data, size)
+                self.assertEqual(features, document.get("features", []))
+                self.assertEqual(header, expected_header)
+
+    def test_document_split_at_every_block_size(self):
+        self.assert_parses_at_every_block_size(DOCUMENT)
+
+    def test_pretty_printed_document(self):
+        data = json.dumps(DOCUMENT, indent=2, ensure_ascii=False).encode("utf-8")
+        self.assert_parses_at_every_block_size(DOCUMENT, data)
+
+    def test_numbers_split_across_blocks(self):
+        data = b'{"count":1234567890,"features":[{"a":-98.76e+5}],"tail":42}'
+        self.assertEqual(parse(data, 3), ([{"a": -98.76e5}], [("count", 1234567890), ("tail", 42)]))
+        # The number ends exactly where a block ends; the next block carries on with digits.
+        self.assertEqual(list(iter_feature_collection([b'{"n":12', b"34}"])), [("n", 1234)])
+        self.assertEqual(list(iter_feature_collection([b'{"n":1.', b"5e", b"3}"])), [("n", 1500.0)])
+        self.assertEqual(list(iter_feature_collection([b'{"n":-2e', b"-", b"3}"])), [("n", -0.002)])
+
+    def test_multibyte_utf8_split_across_blocks(self):
+        data = '{"name":"Ōtautahi ✓ 🗺"}'.encode("utf-8")
+        for size in range(1, len(data) + 1):
+            with self.subTest(block_size=size):
+                self.assertEqual(list(iter_feature_collection(blocks(data, size))), [("name", "Ōtautahi ✓ 🗺")])
+
+    def test_invalid_utf8(self):
+        with self.assertRaises(StreamParseError):
+            list(iter_feature_collection([b'{"name":"\xff"}']))
+
+    def test_empty_features(self):
+        self.assert_parses_at_every_block_size({"fields": [], "features": []})
+        self.assertEqual(parse(b'{"features" : [ ] }', 1), ([], []))
+
+    def test_keys_after_features(self):
+        document = {"features": [{"attributes": {"OBJECTID": 1}}], "exceededTransferLimit": True, "fields": []}
+        self.assert_parses_at_every_block_size(document)
+
+    def test_empty_object(self):
+        self.assertEqual(list(iter_feature_collection([b" { } "])), [])
+
+    def test_error_response(self):
+        data = b'{"error":{"code":498,"message":"Invalid token"}}'
+        self.assertEqual(parse(data, 5), ([], [("error", {"code": 498, "message": "Invalid token"})]))
+
+    def test_features_that_are_not_an_array(self):
+        self.assertEqual(list(iter_feature_collection([b'{"features":null}'])), [("features", None)])
+
+    def test_truncated_bodies(self):
+        data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+        for end in range(len(data)):
+            with self.subTest(truncated_at=end):
+                with self.assertRaises(StreamParseError):
+                    list(iter_feature_collection(blocks(data[:end], 7)))
+
+    def test_not_an_object(self):
+        for data in (b"[1, 2]", b"null", b'{"a" 1}', b'{"a": 1 "b": 2}', b'{"features": [{} {}]}'):
+            with self.subTest(data=data):
+                with self.assertRaises(StreamParseError):
+                    list(iter_feature_collection([data]))
+
+    def test_stream_parse_error_is_a_value_error(self):
+        self.assertTrue(issubclass(StreamParseError, ValueError))
+
+
+class FeatureFileWriterTests(unittest.TestCase):
+    def write(self, items):
+        handle = io.StringIO()
+        writer = FeatureFileWriter(handle)
+        for key, value in items:
+            if key is FEATURE:
+                writer.feature(value)
+            else:
+                writer.header(key, value)
+        writer.close()
+        return json.loads(handle.getvalue()), writer.count
+
+    def test_round_trip(self):
+        data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+        written, count = self.write(iter_feature_collection(blocks(data, 16)))
+        self.assertEqual(written, DOCUMENT)
+        self.assertEqual(count, 2)
+
+    def test_no_features_still_writes_an_empty_array(self):
+        written, count = self.write([("fields", [])])
+        self.assertEqual(written, {"fields": [], "features": []})
+        self.assertEqual(count, 0)
+
+    def test_nothing_at_all(self):
+        self.assertEqual(self.write([]), ({"features": []}, 0))
+
+    def test_keys_after_features_are_written_after_them(self):
+        handle = io.StringIO()
+        writer = FeatureFileWriter(handle)
+        writer.feature({"attributes": {"OBJECTID": 1}})
+        writer.header("exceededTransferLimit", True)
+        writer.close()
+        self.assertEqual(handle.getvalue(), '{"features":[{"attributes":{"OBJECTID":1}}],"exceededTransferLimit":true}')
+
+    def test_second_features_array_is_rejected(self):
+        writer = FeatureFileWriter(io.StringIO())
+        writer.feature({})
+        writer.header("fields", [])
+        with self.assertRaises(StreamParseError):
+            writer.feature({})
+
+
+if __name__ == "__main__":
+    unittest.main()